@@ -15,18 +15,19 @@
 import json
 
 import eventlet
-from muranocommon.messaging import MqClient
+import eventlet.semaphore
+from muranocommon.messaging import MqClient, Message
 
 from engine import system
-from engine.dsl import ObjectStore
-from engine.enviroment import Environment
+from engine.system import replay
+from engine import scheduler
 from openstack.common import service
 from openstack.common import log as logging
 import config as cfg
-from dsl.executor import MuranoDslExecutor
 import class_loader
 import eventlet
-import dsl.results_serializer
+import dsl.profiler
+from dsl import tasks
 
 log = logging.getLogger(__name__)
 
@@ -34,8 +35,14 @@ log = logging.getLogger(__name__)
 class EngineService(service.Service):
     def __init__(self):
         super(EngineService, self).__init__()
+        self._class_loader = None
+        self._scheduler = None
+        self._prefetch_count = cfg.CONF.task_prefetch_count
+        self._task_slots = eventlet.semaphore.Semaphore(self._prefetch_count)
+        self._in_flight = 0
 
     def start(self):
+        self._scheduler = self._create_scheduler()
         #super(EngineService, self).start()
         #self.tg.add_thread(self._start_rabbitmq)
         self.test()
@@ -43,10 +50,62 @@ class EngineService(service.Service):
     def stop(self):
         super(EngineService, self).stop()
 
+    def statistics(self):
+        return {
+            'prefetch': self._prefetch_count,
+            'inFlight': self._in_flight,
+            'queued': self._scheduler.queued_count,
+            'running': self._scheduler.running_count,
+            'tasks': self._scheduler.task_pool.statistics()
+        }
+
+    def cancel(self, deployment_id):
+        return self._scheduler.cancel(deployment_id)
+
     def _task_received(self, message):
-        task = message.body or {}
-        message_id = message.id
-        message.ack()
+        try:
+            task = message.body or {}
+            deployment = scheduler.Deployment(
+                message.id, task.get('tenant_id'), task.get('token'),
+                task.get('model'))
+            try:
+                self._scheduler.submit(deployment).wait()
+            except Exception:
+                # already logged by the scheduler, partial result is
+                # still reported back
+                pass
+            self._publish_result(message.id, self._get_result(deployment))
+            message.ack()
+        except Exception as ex:
+            log.exception(ex)
+        finally:
+            self._in_flight -= 1
+            self._task_slots.release()
+            log.debug('Task {0} finished: {1}'.format(
+                message.id, self.statistics()))
+
+    def _get_result(self, deployment):
+        if deployment.result is not None:
+            return deployment.result
+        # the model could not be loaded or the deployment was cancelled
+        # before it started. The unchanged model is reported back so that
+        # the task is still finished for the API
+        model = deployment.model if isinstance(
+            deployment.model, dict) else {}
+        return {
+            'Objects': model.get('Objects'),
+            'Attributes': model.get('Attributes') or [],
+            'State': deployment.state,
+            'Error': None if deployment.error is None
+            else unicode(deployment.error)
+        }
+
+    def _publish_result(self, message_id, result):
+        msg = Message()
+        msg.body = result
+        msg.id = message_id
+        with self.create_rmq_client() as mq:
+            mq.send(message=msg, key='task-results')
 
     def create_rmq_client(self):
         rabbitmq = cfg.CONF.rabbitmq
@@ -68,12 +127,21 @@ class EngineService(service.Service):
                 with self.create_rmq_client() as mq:
                     mq.declare('tasks', 'tasks')
                     mq.declare('task-results')
-                    with mq.open('tasks', prefetch_count=1) as subscription:
+                    with mq.open('tasks', prefetch_count=self._prefetch_count)\
+                            as subscription:
                         reconnect_delay = 1
                         while True:
-                            msg = subscription.get_message(timeout=2)
-                            if msg is not None:
-                                eventlet.spawn(self._task_received, msg)
+                            self._task_slots.acquire()
+                            try:
+                                msg = subscription.get_message(timeout=2)
+                            except Exception:
+                                self._task_slots.release()
+                                raise
+                            if msg is None:
+                                self._task_slots.release()
+                                continue
+                            self._in_flight += 1
+                            eventlet.spawn_n(self._task_received, msg)
             except Exception as ex:
                 log.exception(ex)
 
@@ -91,19 +159,25 @@ class EngineService(service.Service):
         #print '<<<', msg
         return 15
 
-    def test(self):
-
-        environment = Environment()
-        environment.tenant_id = ''
-        environment.token = ''
-
+    def _create_scheduler(self):
         base_path = './meta'
         cl = class_loader.ClassLoader(base_path)
         system.register(cl, base_path)
-        executor = MuranoDslExecutor(cl, environment)
         object_class = cl.get_class("com.mirantis.murano.Object")
         object_class.add_method('debugPrint', self.debug_print)
         object_class.add_method('debugPrint2', self.debug_print2)
+        self._class_loader = cl
+        return scheduler.DeploymentScheduler(
+            cl, cfg.CONF.max_environments,
+            inline_calls=cfg.CONF.inline_method_calls,
+            compile_expressions=cfg.CONF.compile_expressions,
+            task_pool=tasks.TaskPool(cfg.CONF.max_green_threads,
+                                     cfg.CONF.deployment_green_threads),
+            statements_per_yield=cfg.CONF.statements_per_yield,
+            method_timeout=cfg.CONF.method_timeout,
+            method_max_steps=cfg.CONF.method_max_steps)
+
+    def test(self):
 
         # obj = executor.load({
         #     '?': {
@@ -143,10 +217,19 @@ class EngineService(service.Service):
 
         filename = './ad.json'
 
-        with open(filename) as file:
-            data = file.read()
+        tracer = None
+        if cfg.CONF.trace_replay:
+            tracer = replay.Player.load(cfg.CONF.trace_replay)
+            model = tracer.model
+        else:
+            with open(filename) as file:
+                data = file.read()
+            model = json.loads(data)
+            if cfg.CONF.trace_record:
+                tracer = replay.Recorder(json.loads(data))
 
-        obj = executor.load(json.loads(data))
+        deployment = scheduler.Deployment('test', '', '', model)
+        deployment.tracer = tracer
 
 
         # objects = object_store.load({
@@ -161,13 +244,24 @@ class EngineService(service.Service):
 
 
 #       print test_class.name
+        profiler = None
+        if cfg.CONF.profile_output:
+            profiler = deployment.profiler = dsl.profiler.Profiler()
+            profiler.start()
         try:
-            res = obj.type.invoke('deploy', executor, obj, {})
-            print "=", res
+            self._scheduler.submit(deployment).wait()
         finally:
-            with open(filename, 'w') as file:
-                file.write(json.dumps(dsl.results_serializer.serialize(
-                    obj, executor), indent=True))
+            if isinstance(tracer, replay.Recorder):
+                tracer.save(cfg.CONF.trace_record)
+            if not isinstance(tracer, replay.Player) and \
+                    deployment.result is not None:
+                with open(filename, 'w') as file:
+                    file.write(json.dumps(deployment.result, indent=True))
+            if profiler is not None:
+                profiler.stop()
+                profiler.write_report(cfg.CONF.profile_output + '.json')
+                profiler.write_collapsed_stacks(
+                    cfg.CONF.profile_output + '.folded')
 
 
         exit()
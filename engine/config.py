@@ -81,6 +81,17 @@ CONF.register_cli_opt(cfg.StrOpt('murano_metadata_url'))
 
 CONF.register_opt(cfg.IntOpt('max_environments', default=20))
 CONF.register_opt(cfg.IntOpt('max_hosts', default=250))
+CONF.register_opt(cfg.IntOpt('task_prefetch_count', default=40))
+CONF.register_opt(cfg.IntOpt('max_green_threads', default=1000))
+CONF.register_opt(cfg.IntOpt('deployment_green_threads', default=250))
+CONF.register_opt(cfg.BoolOpt('inline_method_calls', default=True))
+CONF.register_opt(cfg.BoolOpt('compile_expressions', default=True))
+CONF.register_opt(cfg.IntOpt('statements_per_yield', default=200))
+CONF.register_opt(cfg.IntOpt('method_timeout', default=0))
+CONF.register_opt(cfg.IntOpt('method_max_steps', default=0))
+CONF.register_opt(cfg.StrOpt('profile_output'))
+CONF.register_opt(cfg.StrOpt('trace_record'))
+CONF.register_opt(cfg.StrOpt('trace_replay'))
 CONF.register_opt(cfg.StrOpt('env_ip_template', default='10.0.0.0'))
 CONF.register_opt(cfg.StrOpt('network_topology',
                              choices=['nova', 'flat', 'routed'],
@@ -6,9 +6,10 @@ from . import MuranoObject
 import exceptions
 import yaql.exceptions
 import helpers
+import time_slicer
 
 
-def _resolve(name, obj):
+def resolve(name, obj):
     @EvalArg('this', MuranoObject)
     @ContextAware()
     def invoke(context, this, *args):
@@ -81,8 +82,9 @@ def _super2(value, func):
 
 
 @EvalArg('value', MuranoObject)
-def _psuper2(value, func):
-    helpers.parallel_select(_super(value), func)
+@ContextAware()
+def _psuper2(context, value, func):
+    helpers.parallel_select(_super(value), func, context)
 
 
 @EvalArg('value', object)
@@ -108,11 +110,12 @@ def _get_container(context, obj, class_name):
 
 @EvalArg('seconds', (int, float))
 def _sleep(seconds):
+    time_slicer.check_method_timers()
     eventlet.sleep(seconds)
 
 
 def register(context):
-    context.register_function(_resolve, '#resolve')
+    context.register_function(resolve, '#resolve')
     context.register_function(_cast, 'cast')
     context.register_function(_new, 'new')
     context.register_function(_id, 'id')
@@ -31,3 +31,23 @@ class NoWriteAccess(Exception):
     def __init__(self, name):
         super(NoWriteAccess, self).__init__(
             'Property %s is immutable to the caller' % name)
+
+
+class DeadlockDetected(Exception):
+    def __init__(self, methods):
+        super(DeadlockDetected, self).__init__(
+            'Deadlock detected while waiting for %s' % ' -> '.join(
+                str(t) for t in methods))
+
+
+class MethodTimeout(Exception):
+    def __init__(self, method, timeout):
+        super(MethodTimeout, self).__init__(
+            'Method %s did not complete in %s seconds' % (method, timeout))
+
+
+class StepLimitExceeded(Exception):
+    def __init__(self, method, max_steps):
+        super(StepLimitExceeded, self).__init__(
+            'Method %s executed more than %s loop steps' % (
+                method, max_steps))
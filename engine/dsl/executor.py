@@ -1,24 +1,64 @@
-import functools
-import inspect
 import uuid
 import types
 
 import eventlet
-from eventlet.event import Event
+import greenlet
 from yaql.context import EvalArg, Context
 
 import expressions
 import exceptions
 import helpers
 from attribute_store import AttributeStore
+from lock_manager import MethodLockManager
+from murano_method import NativeMethodDescriptor
 from murano_object import MuranoObject
 from object_store import ObjectStore
+import profiler
 import dsl_yaql_functions
+import tasks
+import time_slicer
+from time_slicer import StepBudget, TimeSlicer
+import yaql_compiler
+
+
+_NO_FUNCTIONS = {}
+
+
+class MethodFrame(Context):
+    def __init__(self, class_context, this, caller_context, arguments):
+        self.parent_context = class_context
+        self.depth = class_context.depth + 1
+        self.functions = _NO_FUNCTIONS
+        self.data = {
+            '$': this,
+            '$1': this,
+            '$this': this,
+            '$?this': this,
+            '$?callerContext': caller_context
+        }
+        for key, value in arguments.iteritems():
+            self.set_data(value, key)
+
+    def register_function(self, function, name):
+        if self.functions is _NO_FUNCTIONS:
+            self.functions = {}
+        Context.register_function(self, function, name)
+
+    def get_functions(self, function_name, num_params):
+        if self.functions is _NO_FUNCTIONS:
+            return self.parent_context.get_functions(
+                function_name, num_params)
+        return Context.get_functions(self, function_name, num_params)
 
 
 class MuranoDslExecutor(object):
-    def __init__(self, class_loader, environment=None):
+    def __init__(self, class_loader, environment=None, inline_calls=True,
+                 compile_expressions=True, task_pool=None,
+                 statements_per_yield=200, method_timeout=None,
+                 method_max_steps=None, profiler=None, tracer=None):
         self._class_loader = class_loader
+        self._inline_calls = inline_calls
+        self._compile_expressions = compile_expressions
         self._object_store = ObjectStore(class_loader)
         self._attribute_store = AttributeStore()
         self._root_context = class_loader.create_root_context()
@@ -27,7 +67,14 @@ class MuranoDslExecutor(object):
         self._root_context.set_data(environment, '?environment')
         self._root_context.set_data(self._object_store, '?objectStore')
         self._root_context.set_data(self._attribute_store, '?attributeStore')
-        self._locks = {}
+        self._root_context.set_data(profiler, '?profiler')
+        self._locks = MethodLockManager()
+        self._task_group = (task_pool or tasks.default_pool).create_group()
+        self._time_slicer = TimeSlicer(statements_per_yield)
+        self._method_timeout = method_timeout
+        self._method_max_steps = method_max_steps
+        self._tracer = tracer
+        self._class_contexts = {}
         dsl_yaql_functions.register(self._root_context)
         self._root_context = Context(self._root_context)
 
@@ -39,6 +86,30 @@ class MuranoDslExecutor(object):
     def attribute_store(self):
         return self._attribute_store
 
+    @property
+    def lock_manager(self):
+        return self._locks
+
+    @property
+    def task_group(self):
+        return self._task_group
+
+    @property
+    def time_slicer(self):
+        return self._time_slicer
+
+    @property
+    def tracer(self):
+        # records or replays the traffic of system classes, see
+        # engine.system.replay
+        return self._tracer
+
+    def cancel(self):
+        # Kills every green thread of the deployment, agent listeners
+        # included, and drops the method locks left behind
+        self._task_group.cancel()
+        self._locks.release_all()
+
     def to_yaql_args(self, args):
         if not args:
             return tuple()
@@ -52,34 +123,37 @@ class MuranoDslExecutor(object):
             raise ValueError()
 
     def invoke_method(self, name, this, context, murano_class, *args):
+        # yaql swallows the exceptions that interrupt a thread when they
+        # are raised while it evaluates a function argument
+        if self._task_group.cancelled:
+            raise greenlet.GreenletExit()
+        time_slicer.check_method_timers()
         if context is None:
             context = self._root_context
-        implementations = this.type.find_method(name)
-        delegates = []
-        for declaring_class, name in implementations:
-            method = declaring_class.get_method(name)
-            if not method:
-                continue
-            arguments_scheme = method.arguments_scheme
-            try:
-                try:
-                    params = self._evaluate_parameters(
-                        arguments_scheme, context, this, *args)
-                except Exception as e:
-                    print e
-                    params = self._evaluate_parameters(
-                        arguments_scheme, context, this, *args)
-                delegates.append(functools.partial(
-                    self._invoke_method_implementation,
-                    method, this, declaring_class, context, params))
-            except TypeError:
-                continue
-        if len(delegates) < 1:
+        positional, named = self._evaluate_arguments(context, *args)
+        candidates = []
+        for declaring_class, method_name in this.type.find_method(name):
+            method = declaring_class.get_method(method_name)
+            if method and method.binder.accepts(len(positional), named):
+                candidates.append((declaring_class, method))
+        if len(candidates) < 1:
             raise exceptions.NoMethodFound(name)
-        elif len(delegates) > 1:
+        elif len(candidates) > 1:
             raise exceptions.AmbiguousMethodName(name)
-        else:
-            return delegates[0]()
+        declaring_class, method = candidates[0]
+        params = method.binder.bind(
+            positional, named, this, context, self._root_context,
+            self._object_store)
+        active_profiler = profiler.active(context)
+        if active_profiler is None:
+            return self._invoke_method_implementation(
+                method, this, declaring_class, context, params)
+        active_profiler.enter('%s.%s' % (declaring_class.name, method.name))
+        try:
+            return self._invoke_method_implementation(
+                method, this, declaring_class, context, params)
+        finally:
+            active_profiler.leave()
 
     def _invoke_method_implementation(self, method, this, murano_class,
                                       context, params):
@@ -87,95 +161,119 @@ class MuranoDslExecutor(object):
         if not body:
             return None
 
+        method_name = '%s.%s' % (murano_class.name, method.name)
+        timeout = self._method_timeout if method.timeout is None \
+            else method.timeout
+        if not timeout:
+            return self._invoke_method_locked(
+                method, method_name, this, murano_class, context, params)
+        timer = time_slicer.start_method_timer(timeout)
+        try:
+            try:
+                result = self._invoke_method_locked(
+                    method, method_name, this, murano_class, context, params)
+            except eventlet.Timeout as e:
+                if e is not timer:
+                    raise
+                raise exceptions.MethodTimeout(method_name, timeout)
+            except Exception:
+                # expressions run by yaql report the timeout as their own
+                # failure or even as a result
+                if not time_slicer.is_expired(timer):
+                    raise
+                raise exceptions.MethodTimeout(method_name, timeout)
+            if time_slicer.is_expired(timer):
+                raise exceptions.MethodTimeout(method_name, timeout)
+            return result
+        finally:
+            time_slicer.stop_method_timer(timer)
+
+    def _invoke_method_locked(self, method, method_name, this, murano_class,
+                              context, params):
+        max_steps = self._method_max_steps if method.max_steps is None \
+            else method.max_steps
+        step_budget = StepBudget(method_name, max_steps) if max_steps \
+            else None
+
         current_thread = eventlet.greenthread.getcurrent()
-        if not hasattr(current_thread, '_murano_dsl_thread_marker'):
+        if self._inline_calls:
+            thread_marker = current_thread
+        elif not hasattr(current_thread, '_murano_dsl_thread_marker'):
             thread_marker = current_thread._murano_dsl_thread_marker = \
                 uuid.uuid4().hex
         else:
             thread_marker = current_thread._murano_dsl_thread_marker
 
-        method_id = id(body)
-        this_id = this.object_id
-
-        event, marker = self._locks.get((method_id, this_id), (None, None))
-        if event:
-            if marker == thread_marker:
+        lock_key = (id(method.body), this.object_id)
+        self._locks.acquire(lock_key, thread_marker, method_name)
+        try:
+            if self._inline_calls:
                 return self._invoke_method_implementation_gt(
-                    body, this, params, murano_class, context)
-            event.wait()
-
-        event = Event()
-        self._locks[(method_id, this_id)] = (event, thread_marker)
-        gt = eventlet.spawn(self._invoke_method_implementation_gt, body,
-                            this, params, murano_class, context,
-                            thread_marker)
-        result = gt.wait()
-        del self._locks[(method_id, this_id)]
-        event.send()
-        return result
+                    method.body, this, params, murano_class, context,
+                    step_budget)
+            gt = self._task_group.spawn_unpooled(
+                self._invoke_method_implementation_gt, method.body, this,
+                params, murano_class, context, step_budget, thread_marker)
+            try:
+                return gt.wait()
+            except BaseException:
+                # the caller is interrupted (e.g. by its timeout), the
+                # body must not outlive it
+                gt.kill()
+                raise
+        finally:
+            self._locks.release(lock_key, thread_marker)
 
     def _invoke_method_implementation_gt(self, body, this,
                                          params, murano_class, context,
+                                         step_budget=None,
                                          thread_marker=None):
         if thread_marker:
             current_thread = eventlet.greenthread.getcurrent()
             current_thread._murano_dsl_thread_marker = thread_marker
-        if callable(body):
-            if '_context' in inspect.getargspec(body).args:
+        if isinstance(body, NativeMethodDescriptor):
+            if body.takes_context:
                 params['_context'] = self._create_context(
                     this, murano_class, context, **params)
-            if inspect.ismethod(body) and not body.__self__:
-                return body(this, **params)
-            else:
-                return body(**params)
+            return body(this, params)
         elif isinstance(body, expressions.DslExpression):
-            return self.execute(body, murano_class, this, context, **params)
+            new_context = self._create_context(
+                this, murano_class, context, **params)
+            if step_budget is not None:
+                new_context.set_data(step_budget, '?stepBudget')
+            return body.execute(new_context, murano_class)
         else:
             raise ValueError()
 
-    def _evaluate_parameters(self, arguments_scheme, context, this, *args):
-        arg_names = list(arguments_scheme.keys())
-        parameter_values = {}
-        i = 0
+    def _evaluate_arguments(self, context, *args):
+        positional = []
+        named = {}
         for arg in args:
             value = helpers.evaluate(arg, context)
+            name = None
             if isinstance(value, types.TupleType) and len(value) == 2 and \
                     isinstance(value[0], types.StringTypes):
-                name = value[0]
-                value = value[1]
-                if name not in arguments_scheme:
-                    raise TypeError()
-            else:
-                if i >= len(arg_names):
-                    raise TypeError()
-                name = arg_names[i]
-                i += 1
-
+                name, value = value
             if callable(value):
                 value = value()
-            arg_spec = arguments_scheme[name]
-            parameter_values[name] = arg_spec.validate(
-                value, this, self._root_context, self._object_store)
-
-        for name, arg_spec in arguments_scheme.iteritems():
-            if name not in parameter_values:
-                if not arg_spec.has_default:
-                    raise TypeError()
-                parameter_values[name] = arg_spec.validate(
-                    helpers.evaluate(arg_spec.default, context),
-                    this, self._root_context, self._object_store)
-
-        return parameter_values
+            if name is None:
+                positional.append(value)
+            else:
+                named[name] = value
+        return positional, named
 
     def _create_context(self, this, murano_class, context, **kwargs):
+        class_context = self._class_contexts.get(murano_class)
+        if class_context is None:
+            class_context = self._create_class_context(murano_class)
+            self._class_contexts[murano_class] = class_context
+        return MethodFrame(class_context, this, context, kwargs)
+
+    def _create_class_context(self, murano_class):
         new_context = self._class_loader.create_local_context(
             parent_context=self._root_context,
             murano_class=murano_class)
-        new_context.set_data(this)
-        new_context.set_data(this, 'this')
-        new_context.set_data(this, '?this')
         new_context.set_data(murano_class, '?type')
-        new_context.set_data(context, '?callerContext')
 
         @EvalArg('obj', arg_type=MuranoObject)
         @EvalArg('property_name', arg_type=str)
@@ -191,8 +289,10 @@ class MuranoDslExecutor(object):
 
         new_context.register_function(obj_attribution, '#operator_.')
         new_context.register_function(validate, '#validate')
-        for key, value in kwargs.iteritems():
-            new_context.set_data(value, key)
+        if self._compile_expressions:
+            new_context.function_table = yaql_compiler.FunctionTable(
+                new_context, murano_class, obj_attribution,
+                dsl_yaql_functions.resolve)
         return new_context
 
     def execute(self, expression, murano_class, this, context, **kwargs):
@@ -1,14 +1,25 @@
 import inspect
+import itertools
 import types
 from lhs_expression import LhsExpression
 import helpers
 from yaql_expression import YaqlExpression
 
-_macros = []
+# macro classes by the set of keys of the statements they handle
+_macros = {}
 
 
 def register_macro(cls):
-    _macros.append(cls)
+    # every combination of the required and optional constructor arguments
+    # is a valid statement. The first macro registered for a set of keys
+    # wins
+    arg_spec = inspect.getargspec(cls.__init__)
+    names = arg_spec.args[1:]
+    optional = names[len(names) - len(arg_spec.defaults or ()):]
+    required = frozenset(names[:len(names) - len(optional)])
+    for count in xrange(len(optional) + 1):
+        for keys in itertools.combinations(optional, count):
+            _macros.setdefault(required.union(keys), cls)
 
 
 class DslExpression(object):
@@ -31,6 +42,7 @@ class Statement(DslExpression):
 
         self._destination = None if not key else LhsExpression(key)
         self._expression = value
+        self._evaluate = helpers.compile_evaluator(value)
 
     @property
     def destination(self):
@@ -41,7 +53,7 @@ class Statement(DslExpression):
         return self._expression
 
     def execute(self, context, murano_class):
-        result = helpers.evaluate(self.expression, context)
+        result = self._evaluate(context)
         if self.destination:
             self.destination(result, context, murano_class)
 
@@ -63,11 +75,11 @@ def parse_expression(expr):
                 kwds[key] = value
 
         if result is None:
-            for cls in _macros:
-                try:
-                    return cls(**kwds)
-                except TypeError:
-                    continue
+            cls = _macros.get(frozenset(kwds))
+            if cls is None:
+                raise SyntaxError('Unknown statement with keys: {0}'.format(
+                    ', '.join(sorted(map(unicode, kwds)))))
+            return cls(**kwds)
 
     if result is None:
         raise SyntaxError()
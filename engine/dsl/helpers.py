@@ -8,7 +8,7 @@ import sys
 import murano_object
 from yaql_expression import YaqlExpression
 import yaql.expressions
-from eventlet.greenpool import GreenPool
+import tasks
 
 
 def serialize(value, memo=None):
@@ -59,6 +59,97 @@ def evaluate(value, context, max_depth=sys.maxint):
         return value
 
 
+_IMMUTABLE_TYPES = frozenset([
+    types.NoneType, types.BooleanType, types.IntType, types.LongType,
+    types.FloatType, types.StringType, types.UnicodeType])
+
+
+def compile_evaluator(value, max_depth=sys.maxint):
+    # Returns a function of context equivalent to
+    # evaluate(value, context, max_depth). Constant subtrees are detected
+    # once: immutable leaves are shared and containers are copied by a
+    # function built for their shape, so callers may still mutate results
+    if _is_constant(value):
+        return _compile_copier(value)
+    if isinstance(value, (YaqlExpression, yaql.expressions.Expression)):
+        if max_depth <= 0:
+            return lambda context: lambda: evaluate(
+                value.evaluate(context), context, 1)
+        return lambda context: _evaluate_result(
+            value.evaluate(context), context)
+    elif isinstance(value, types.DictionaryType):
+        items = [(compile_evaluator(d_key, max_depth - 1),
+                  compile_evaluator(d_value, max_depth - 1))
+                 for d_key, d_value in value.iteritems()]
+
+        def build_dict(context):
+            result = {}
+            for get_key, get_value in items:
+                result[get_key(context)] = get_value(context)
+            return result
+        return build_dict
+    elif isinstance(value, types.ListType):
+        builders = [compile_evaluator(t, max_depth - 1) for t in value]
+        return lambda context: [t(context) for t in builders]
+    elif isinstance(value, types.TupleType):
+        build_list = compile_evaluator(list(value), max_depth - 1)
+        return lambda context: tuple(build_list(context))
+    elif callable(value):
+        return lambda context: value()
+    elif isinstance(value, types.StringTypes):
+        return lambda context: value
+    elif isinstance(value, collections.Iterable):
+        return lambda context: list(value)
+    else:
+        return lambda context: value
+
+
+def _evaluate_result(result, context):
+    if type(result) in _IMMUTABLE_TYPES:
+        return result
+    return evaluate(result, context, 1)
+
+
+def _is_constant(value):
+    value_type = type(value)
+    if value_type in _IMMUTABLE_TYPES:
+        return True
+    elif value_type is types.DictionaryType:
+        for d_key, d_value in value.iteritems():
+            if not _is_constant(d_key) or not _is_constant(d_value):
+                return False
+        return True
+    elif value_type in (types.ListType, types.TupleType):
+        for t in value:
+            if not _is_constant(t):
+                return False
+        return True
+    return False
+
+
+def _compile_copier(value):
+    value_type = type(value)
+    if value_type in _IMMUTABLE_TYPES:
+        return lambda context: value
+    elif value_type is types.TupleType:
+        if all(type(t) in _IMMUTABLE_TYPES for t in value):
+            return lambda context: value
+        copiers = [_compile_copier(t) for t in value]
+        return lambda context: tuple(t(context) for t in copiers)
+    elif value_type is types.DictionaryType:
+        if all(type(t) in _IMMUTABLE_TYPES for t in value.itervalues()):
+            return lambda context: value.copy()
+        items = [(d_key, _compile_copier(d_value))
+                 for d_key, d_value in value.iteritems()]
+        return lambda context: dict(
+            (d_key, copy(context)) for d_key, copy in items)
+    else:
+        if all(type(t) in _IMMUTABLE_TYPES for t in value):
+            return lambda context: list(value)
+        copiers = [_compile_copier(t) for t in value]
+        return lambda context: [t(context) for t in copiers]
+
+
 def needs_evaluation(value):
     if isinstance(value, (YaqlExpression, yaql.expressions.Expression)):
         return True
@@ -116,9 +207,12 @@ def generate_id():
     return uuid.uuid4().hex
 
 
-def parallel_select(collection, func):
-    gp = GreenPool()
-    return list(gp.imap(func, collection))
+def parallel_select(collection, func, context=None):
+    if context is None:
+        task_group = tasks.default_pool.create_group()
+    else:
+        task_group = get_executor(context).task_group
+    return task_group.map(func, collection)
 
 
 def to_python_codestyle(name):
@@ -134,6 +228,10 @@ def get_executor(context):
     return context.get_data('$?executor')
 
 
+def get_step_budget(context):
+    return context.get_data('$?stepBudget')
+
+
 def get_class_loader(context):
     return context.get_data('$?classLoader')
 
@@ -5,6 +5,7 @@ from yaql.context import EvalArg, Context
 import yaql.expressions
 
 import type_scheme
+import yaql_expression
 from yaql_expression import YaqlExpression
 from murano_object import MuranoObject
 
@@ -26,9 +27,13 @@ class LhsExpression(object):
                                    yaql.expressions.Expression)):
             self._expression = expression
         else:
-            self._expression = yaql.parse(str(expression))
+            self._expression = yaql_expression.parse(expression)
         self._current_obj = None
         self._current_obj_name = None
+        parsed_expression = self._expression
+        if isinstance(parsed_expression, YaqlExpression):
+            parsed_expression = parsed_expression.parsed_expression
+        self._path = _compile_path(parsed_expression)
 
     def _create_context(self, root_context, murano_class):
         def _get_value(src, key):
@@ -114,9 +119,99 @@ class LhsExpression(object):
         return context
 
     def __call__(self, value, context, murano_class):
+        if self._path is not None:
+            variable, keys = self._path
+            return _assign(variable, keys, value, context, murano_class)
         new_context = self._create_context(context, murano_class)
         new_context.set_data(context.get_data('$'))
         self._current_obj = None
         self._current_obj_name = None
         property = self._expression.evaluate(context=new_context)
         property.set(value)
+
+
+def _compile_path(node):
+    # Returns (variable, keys) for destinations made of a context variable
+    # followed by attributions and constant indexes, such as $var, $.a,
+    # $.a.b[0] or $.a[key]. Other destinations are evaluated through yaql
+    keys = []
+    while True:
+        node_type = type(node)
+        if node_type is yaql.expressions.GetContextValue:
+            if type(node.path) is not yaql.expressions.Constant:
+                return None
+            keys.reverse()
+            return node.path.value, keys
+        elif node_type in (yaql.expressions.Att, yaql.expressions.Filter) \
+                and type(node.args[0]) is yaql.expressions.Constant:
+            keys.append(node.args[0].value)
+            node = node.object
+        else:
+            return None
+
+
+def _assign(variable, keys, value, context, murano_class):
+    if not keys:
+        if not variable or variable == '$' or variable == '$this':
+            raise ValueError()
+        context.set_data(value, variable)
+        return
+
+    # the property of the last object on the way to the destination and
+    # the path from that property to the destination
+    owner = None
+    owner_key = None
+    path = []
+    src = context.get_data(variable)
+    for key in keys[:-1]:
+        if isinstance(src, types.DictionaryType):
+            path.append(key)
+            src = src.get(key)
+        elif isinstance(src, types.ListType) and isinstance(
+                key, types.IntType):
+            path.append(key if key >= 0 else key + len(src))
+            src = src[key]
+        elif isinstance(src, MuranoObject) and isinstance(
+                key, types.StringTypes):
+            owner = src
+            owner_key = key
+            path = []
+            src = src.get_property(key, murano_class)
+        else:
+            raise TypeError()
+
+    key = keys[-1]
+    if isinstance(src, types.DictionaryType):
+        old_value = src.get(key, type_scheme.NoValue)
+        path.append(key)
+    elif isinstance(src, types.ListType) and isinstance(key, types.IntType):
+        old_value = src[key]
+        path.append(key if key >= 0 else key + len(src))
+    elif isinstance(src, MuranoObject) and isinstance(
+            key, types.StringTypes):
+        src.set_property(key, value, murano_class)
+        return
+    else:
+        raise TypeError()
+
+    if owner is None:
+        src[key] = value
+        return
+    item = owner.validate_property_item(owner_key, path, value, murano_class)
+    if item is not None:
+        item_key, item_value = item
+        src[item_key] = item_value
+        return
+
+    # the contract of the item depends on the rest of the property
+    src[key] = value
+    try:
+        owner.set_property(
+            owner_key, owner.get_property(owner_key, murano_class),
+            murano_class)
+    except Exception:
+        if old_value is not type_scheme.NoValue:
+            src[key] = old_value
+        else:
+            src.pop(key, None)
+        raise
@@ -0,0 +1,126 @@
+import collections
+import time
+
+from eventlet.event import Event
+
+import exceptions
+import tasks
+
+
+class _MethodLock(object):
+    def __init__(self, name):
+        self.name = name
+        self.owner = None
+        self.count = 0
+        self.waiters = collections.deque()
+
+
+class LockStatistics(object):
+    def __init__(self):
+        self.acquisitions = 0
+        self.contentions = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.queue_length = 0
+        self.max_queue_length = 0
+
+    def to_dictionary(self):
+        return {
+            'acquisitions': self.acquisitions,
+            'contentions': self.contentions,
+            'waitTime': self.wait_time,
+            'maxWaitTime': self.max_wait_time,
+            'queueLength': self.queue_length,
+            'maxQueueLength': self.max_queue_length
+        }
+
+
+class MethodLockManager(object):
+    def __init__(self):
+        self._locks = {}
+        self._waiting = {}
+        self._statistics = collections.defaultdict(LockStatistics)
+
+    def statistics(self):
+        return dict((name, stats.to_dictionary())
+                    for name, stats in self._statistics.iteritems())
+
+    def release_all(self):
+        # drops the locks of a cancelled deployment whose owners did not
+        # release them on their way out
+        self._locks.clear()
+        self._waiting.clear()
+
+    def is_locked(self, key):
+        return key in self._locks
+
+    def acquire(self, key, owner, name=None):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = _MethodLock(name)
+        stats = self._statistics[lock.name]
+        if lock.owner is None:
+            lock.owner = owner
+            lock.count = 1
+            stats.acquisitions += 1
+            return
+        if lock.owner == owner:
+            lock.count += 1
+            return
+
+        self._check_deadlock(lock, owner)
+        waiter = (owner, Event())
+        lock.waiters.append(waiter)
+        self._waiting[owner] = lock
+        stats.contentions += 1
+        stats.queue_length += 1
+        stats.max_queue_length = max(stats.max_queue_length,
+                                     len(lock.waiters))
+        start = time.time()
+        try:
+            with tasks.released_slot():
+                waiter[1].wait()
+        except BaseException:
+            if lock.owner == owner:
+                self.release(key, owner)
+            elif waiter in lock.waiters:
+                lock.waiters.remove(waiter)
+            raise
+        finally:
+            # release_all may have dropped it already
+            self._waiting.pop(owner, None)
+            stats.queue_length -= 1
+            wait_time = time.time() - start
+            stats.wait_time += wait_time
+            stats.max_wait_time = max(stats.max_wait_time, wait_time)
+        stats.acquisitions += 1
+
+    def release(self, key, owner):
+        lock = self._locks.get(key)
+        if lock is None:
+            # dropped by release_all while the owner was unwinding
+            return
+        if lock.owner != owner:
+            raise RuntimeError('Lock is not owned by the caller')
+        lock.count -= 1
+        if lock.count > 0:
+            return
+        if lock.waiters:
+            lock.owner, event = lock.waiters.popleft()
+            lock.count = 1
+            event.send()
+        else:
+            del self._locks[key]
+
+    def _check_deadlock(self, lock, owner):
+        chain = [lock]
+        holder = lock.owner
+        while holder is not None:
+            if holder == owner:
+                raise exceptions.DeadlockDetected(
+                    [t.name for t in chain])
+            next_lock = self._waiting.get(holder)
+            if next_lock is None:
+                return
+            chain.append(next_lock)
+            holder = next_lock.owner
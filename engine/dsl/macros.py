@@ -1,10 +1,11 @@
 from yaql.context import Context
 from yaql_expression import YaqlExpression
+from lhs_expression import LhsExpression
 import expressions
 import types
 import exceptions
 import helpers
-from eventlet.greenpool import GreenPool
+import profiler
 
 
 class CodeBlock(expressions.DslExpression):
@@ -15,14 +16,16 @@ class CodeBlock(expressions.DslExpression):
         self._breakable = breakable
 
     def execute(self, context, murano_class):
+        result = None
         try:
             for expr in self.code_block:
-                expr.execute(context, murano_class)
+                result = expr.execute(context, murano_class)
         except exceptions.BreakException as e:
             if self._breakable:
                 raise e
             else:
                 raise SyntaxError()
+        return result
 
 
 class MethodBlock(CodeBlock):
@@ -38,11 +41,11 @@ class MethodBlock(CodeBlock):
 
 class ReturnMacro(expressions.DslExpression):
     def __init__(self, Return):
-        self._value = Return
+        self._value = helpers.compile_evaluator(Return)
 
+    @profiler.trace('Return')
     def execute(self, context, murano_class):
-        raise exceptions.ReturnException(
-            helpers.evaluate(self._value, context))
+        raise exceptions.ReturnException(self._value(context))
 
 
 class BreakMacro(expressions.DslExpression):
@@ -50,6 +53,7 @@ class BreakMacro(expressions.DslExpression):
         if Break:
             raise SyntaxError()
 
+    @profiler.trace('Break')
     def execute(self, context, murano_class):
         raise exceptions.BreakException()
 
@@ -57,28 +61,27 @@ class BreakMacro(expressions.DslExpression):
 class ParallelMacro(CodeBlock):
     def __init__(self, Parallel, Limit=None):
         super(ParallelMacro, self).__init__(Parallel)
-        if Limit:
-            self._limit = YaqlExpression(Limit)
-        else:
-            self._limit = len(self.code_block)
+        self._limit = YaqlExpression(Limit) if Limit else None
 
+    @profiler.trace('Parallel')
     def execute(self, context, murano_class):
         if not self.code_block:
             return
-        gp = GreenPool(helpers.evaluate(self._limit, context))
-        for expr in self.code_block:
-            gp.spawn_n(expr.execute, context, murano_class)
-        gp.waitall()
+        executor = helpers.get_executor(context)
+        executor.task_group.map(
+            lambda expr: expr.execute(context, murano_class),
+            self.code_block, helpers.evaluate(self._limit, context))
 
 
 class IfMacro(expressions.DslExpression):
     def __init__(self, If, Then, Else=None):
         if not isinstance(If, YaqlExpression):
-            raise TypeError()
+            raise SyntaxError('If condition must be an expression')
         self._code1 = CodeBlock(Then)
         self._code2 = None if Else is None else CodeBlock(Else)
         self._condition = If
 
+    @profiler.trace('If')
     def execute(self, context, murano_class):
         res = self._condition.evaluate(context)
         if not isinstance(res, types.BooleanType):
@@ -92,11 +95,18 @@ class IfMacro(expressions.DslExpression):
 class WhileDoMacro(expressions.DslExpression):
     def __init__(self, While, Do):
         if not isinstance(While, YaqlExpression):
-            raise TypeError()
+            raise SyntaxError('While condition must be an expression')
         self._code = CodeBlock(Do, breakable=True)
         self._condition = While
+        self._name = 'While %s' % While
+        # the condition counts as a statement of every iteration
+        self._statements = len(self._code.code_block) + 1
 
+    @profiler.trace('While')
     def execute(self, context, murano_class):
+        time_slicer = helpers.get_executor(context).time_slicer
+        stats = time_slicer.enter('%s: %s' % (murano_class.name, self._name))
+        step_budget = helpers.get_step_budget(context)
         while True:
             res = self._condition.evaluate(context)
             if not isinstance(res, types.BooleanType):
@@ -108,59 +118,115 @@ class WhileDoMacro(expressions.DslExpression):
                     break
             except exceptions.BreakException:
                 break
+            time_slicer.step(self._statements, stats)
+            if step_budget is not None:
+                step_budget.spend(self._statements)
 
 
 
 class ForMacro(expressions.DslExpression):
-    def __init__(self, For, In, Do):
+    def __init__(self, For, In, Do, Parallel=False, Limit=None, Into=None):
         if not isinstance(For, types.StringTypes):
-            raise TypeError()
-        self._code = CodeBlock(Do, breakable=True)
+            raise SyntaxError('For variable must be a name')
+        if not isinstance(Parallel, types.BooleanType):
+            raise SyntaxError('For Parallel option must be true or false')
+        if Limit is not None and not Parallel:
+            raise SyntaxError('For Limit option requires Parallel')
+        self._code = CodeBlock(Do, breakable=not Parallel)
         self._var = For
-        self._collection = In
+        self._collection = helpers.compile_evaluator(In)
+        self._parallel = Parallel
+        self._limit = helpers.compile_evaluator(Limit)
+        self._destination = None if Into is None else LhsExpression(Into)
 
+    @profiler.trace('For')
     def execute(self, context, murano_class):
-        collection = helpers.evaluate(self._collection, context)
+        collection = self._collection(context)
+        if self._parallel:
+            results = self._execute_parallel(
+                collection, context, murano_class)
+        else:
+            results = self._execute_sequential(
+                collection, context, murano_class)
+        if self._destination:
+            self._destination(results, context, murano_class)
+        return results
+
+    def _execute_sequential(self, collection, context, murano_class):
+        # results are only collected for Into
+        results = None if self._destination is None else []
         child_context = Context(context)
         for t in collection:
             child_context.set_data(t, self._var)
             try:
-                self._code.execute(child_context, murano_class)
+                result = self._code.execute(child_context, murano_class)
             except exceptions.BreakException:
                 break
+            if results is not None:
+                results.append(result)
+        return results
+
+    def _execute_parallel(self, collection, context, murano_class):
+        # iterations run on the task pool with a context of their own.
+        # The first failing iteration cancels the others
+        def iteration(item):
+            child_context = Context(context)
+            child_context.set_data(item, self._var)
+            return self._code.execute(child_context, murano_class)
+
+        executor = helpers.get_executor(context)
+        return executor.task_group.map(
+            iteration, collection, self._limit(context),
+            cancel_on_error=True)
 
 
 class RepeatMacro(expressions.DslExpression):
     def __init__(self, Repeat, Do):
         if not isinstance(Repeat, (int, YaqlExpression)):
             raise SyntaxError()
-        self._count = Repeat
+        self._count = helpers.compile_evaluator(Repeat)
         self._code = CodeBlock(Do, breakable=True)
+        self._name = 'Repeat %s' % Repeat
+        self._statements = len(self._code.code_block)
 
+    @profiler.trace('Repeat')
     def execute(self, context, murano_class):
-        count = helpers.evaluate(self._count, context)
+        count = self._count(context)
+        time_slicer = helpers.get_executor(context).time_slicer
+        stats = time_slicer.enter('%s: %s' % (murano_class.name, self._name))
+        step_budget = helpers.get_step_budget(context)
         for t in range(0, count):
             try:
                 self._code.execute(context, murano_class)
             except exceptions.BreakException:
                 break
+            time_slicer.step(self._statements, stats)
+            if step_budget is not None:
+                step_budget.spend(self._statements)
 
 
 class MatchMacro(expressions.DslExpression):
     def __init__(self, Match, Value, Default=None):
         if not isinstance(Match, types.DictionaryType):
             raise SyntaxError()
-        self._switch = Match
-        self._value = Value
+        # keys are manifest literals, so looking the value up in a dict
+        # finds the same branch as comparing it with every key
+        self._branches = dict(
+            (key, CodeBlock(value)) for key, value in Match.iteritems())
+        self._value = helpers.compile_evaluator(Value)
         self._default = None if Default is None else CodeBlock(Default)
 
+    @profiler.trace('Match')
     def execute(self, context, murano_class):
-        match_value = helpers.evaluate(self._value, context)
-        for key, value in self._switch.iteritems():
-            if key == match_value:
-                CodeBlock(value).execute(context, murano_class)
-                return
-        if self._default is not None:
+        match_value = self._value(context)
+        try:
+            branch = self._branches.get(match_value)
+        except TypeError:
+            # unhashable values are never equal to a literal key
+            branch = None
+        if branch is not None:
+            branch.execute(context, murano_class)
+        elif self._default is not None:
             self._default.execute(context, murano_class)
 
 
@@ -168,21 +234,25 @@ class SwitchMacro(expressions.DslExpression):
     def __init__(self, Switch, Default=None):
         if not isinstance(Switch, types.DictionaryType):
             raise SyntaxError()
-        self._switch = Switch
+        self._branches = []
+        for key, value in Switch.iteritems():
+            if not isinstance(key, (YaqlExpression, types.BooleanType)):
+                raise SyntaxError()
+            self._branches.append(
+                (helpers.compile_evaluator(key), CodeBlock(value)))
         self._default = None if Default is None else CodeBlock(Default)
 
+    @profiler.trace('Switch')
     def execute(self, context, murano_class):
         matched = False
-        for key, value in self._switch.iteritems():
-            if not isinstance(key, (YaqlExpression, types.BooleanType)):
-                raise SyntaxError()
-            res = helpers.evaluate(key, context)
+        for condition, code in self._branches:
+            res = condition(context)
             if not isinstance(res, types.BooleanType):
                 raise TypeError()
             if res:
                 matched = True
                 child_context = Context(context)
-                CodeBlock(value).execute(child_context, murano_class)
+                code.execute(child_context, murano_class)
 
         if self._default is not None and not matched:
             self._default.execute(context, murano_class)
@@ -192,6 +262,7 @@ class DoMacro(expressions.DslExpression):
     def __init__(self, Do):
         self._code = CodeBlock(Do)
 
+    @profiler.trace('Do')
     def execute(self, context, murano_class):
         child_context = Context(context)
         self._code.execute(child_context, murano_class)
@@ -1,7 +1,6 @@
 from collections import deque
-import inspect
 import helpers
-from murano_method import MuranoMethod
+from murano_method import MuranoMethod, NativeMethodDescriptor
 from murano_object import MuranoObject
 from typespec import PropertySpec
 
@@ -20,11 +19,15 @@ class MuranoClass(object):
         self._namespace_resolver = namespace_resolver
         self._name = namespace_resolver.resolve_name(name)
         self._properties = {}
+        self._method_table = None
+        self._subclasses = []
         if self._name == 'com.mirantis.murano.Object':
             self._parents = []
         else:
             self._parents = parents or [
                 class_loader.get_class('com.mirantis.murano.Object')]
+        for parent in self._parents:
+            parent._subclasses.append(self)
         self.object_class = type(
             'mc' + helpers.generate_id(),
             tuple([p.object_class for p in self._parents]) or (MuranoObject,),
@@ -34,6 +37,19 @@ class MuranoClass(object):
     def name(self):
         return self._name
 
+    @property
+    def object_class(self):
+        return self._object_class
+
+    @object_class.setter
+    def object_class(self, value):
+        self._object_class = value
+        self._initializer = NativeMethodDescriptor(value.initialize)
+
+    @property
+    def initializer(self):
+        return self._initializer
+
     @property
     def namespace_resolver(self):
         return self._namespace_resolver
@@ -55,6 +71,7 @@ class MuranoClass(object):
         method = MuranoMethod(self._namespace_resolver,
                               self, name, payload)
         self._methods[name] = method
+        self._invalidate_method_table()
         return method
 
     @property
@@ -71,13 +88,36 @@ class MuranoClass(object):
 
     def find_method(self, name):
         #resolved_name = self._namespace_resolver.resolve_name(name, self.name)
-        if name in self._methods:
-            return [(self, name)]
-        if not self._parents:
-            return []
-        return list(set(reduce(
-            lambda x, y: x + y,
-            [p.find_method(name) for p in self._parents])))
+        return self._get_method_table().get(name, [])
+
+    def _get_method_table(self):
+        table = self._method_table
+        if table is None:
+            table = self._method_table = self._build_method_table()
+        return table
+
+    def _build_method_table(self):
+        table = {}
+        for parent in self._parents:
+            for name, implementations in \
+                    parent._get_method_table().iteritems():
+                if name in self._methods:
+                    continue
+                existing = table.setdefault(name, [])
+                for implementation in implementations:
+                    if implementation not in existing:
+                        existing.append(implementation)
+        for name in self._methods:
+            table[name] = [(self, name)]
+        return table
+
+    def _invalidate_method_table(self):
+        types = deque([self])
+        while len(types) > 0:
+            mc = types.popleft()
+            if mc._method_table is not None:
+                mc._method_table = None
+                types.extend(mc._subclasses)
 
     def find_property(self, name):
         types = deque([self])
@@ -109,12 +149,12 @@ class MuranoClass(object):
         obj = self.object_class(self, parent, object_store, context,
                                 object_id=object_id, **kwargs)
         if parameters is not None:
-            argspec = inspect.getargspec(obj.initialize).args
-            if '_context' in argspec:
+            initializer = self._initializer
+            if initializer.takes_context:
                 parameters['_context'] = context
-            if '_parent' in argspec:
+            if initializer.takes_parent:
                 parameters['_parent'] = parent
-            obj.initialize(**parameters)
+            initializer(obj, parameters)
         return obj
 
     def __str__(self):
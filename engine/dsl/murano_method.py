@@ -7,18 +7,118 @@ import typespec
 import macros
 
 
+class ArgumentBinder(object):
+    def __init__(self, arguments_scheme):
+        self._names = tuple(arguments_scheme.keys())
+        self._specs = dict(arguments_scheme)
+        self._required = tuple(
+            (index, name) for index, name in enumerate(self._names)
+            if not arguments_scheme[name].has_default)
+        self._defaults = tuple(
+            (name, spec) for name, spec in arguments_scheme.iteritems()
+            if spec.has_default)
+
+    def accepts(self, positional_count, named):
+        if positional_count > len(self._names):
+            return False
+        for name in named:
+            if name not in self._specs:
+                return False
+        for index, name in self._required:
+            if index >= positional_count and name not in named:
+                return False
+        return True
+
+    def bind(self, positional, named, this, context, root_context,
+             object_store):
+        result = {}
+        for name, value in zip(self._names, positional):
+            result[name] = self._specs[name].validate(
+                value, this, root_context, object_store)
+        for name, value in named.iteritems():
+            result[name] = self._specs[name].validate(
+                value, this, root_context, object_store)
+        for name, spec in self._defaults:
+            if name not in result:
+                result[name] = spec.validate(
+                    spec.evaluate_default(context),
+                    this, root_context, object_store)
+        return result
+
+
+class NativeMethodDescriptor(object):
+    def __init__(self, func):
+        func_info = inspect.getargspec(func)
+        arg_names = func_info.args
+        if inspect.ismethod(func):
+            arg_names = arg_names[1:]
+        self._func = func
+        self._arg_names = tuple(arg_names)
+        self._defaults = func_info.defaults or tuple()
+        self._takes_context = '_context' in arg_names
+        self._takes_parent = '_parent' in arg_names
+        self._is_bound = not inspect.ismethod(func) or \
+            func.__self__ is not None
+        if self._is_bound:
+            self._thunk = lambda this, params: func(**params)
+        else:
+            self._thunk = lambda this, params: func(this, **params)
+
+    @property
+    def func(self):
+        return self._func
+
+    @property
+    def arg_names(self):
+        return self._arg_names
+
+    @property
+    def defaults(self):
+        return self._defaults
+
+    @property
+    def takes_context(self):
+        return self._takes_context
+
+    @property
+    def takes_parent(self):
+        return self._takes_parent
+
+    @property
+    def is_bound(self):
+        return self._is_bound
+
+    def __call__(self, this, params):
+        return self._thunk(this, params)
+
+
 class MuranoMethod(object):
     def __init__(self, namespace_resolver,
                  murano_class, name, payload):
         self._name = name
         self._namespace_resolver = namespace_resolver
 
+        self._timeout = None
+        self._max_steps = None
         if callable(payload):
-            self._body = payload
-            self._arguments_scheme = self._generate_arguments_scheme(payload)
+            self._body = NativeMethodDescriptor(payload)
+            self._arguments_scheme = self._generate_arguments_scheme(
+                self._body)
         else:
             payload = payload or {}
             self._body = self._prepare_body(payload.get('Body') or [])
+            self._timeout = payload.get('Timeout')
+            if self._timeout is not None and (
+                    not isinstance(self._timeout, (int, float)) or
+                    isinstance(self._timeout, bool)):
+                raise ValueError('Timeout of method %s must be a number of '
+                                 'seconds' % name)
+            self._max_steps = payload.get('MaxSteps')
+            if self._max_steps is not None and (
+                    not isinstance(self._max_steps, int) or
+                    isinstance(self._max_steps, bool)):
+                raise ValueError('MaxSteps of method %s must be an '
+                                 'integer' % name)
             arguments_scheme = payload.get('Arguments') or []
             if isinstance(arguments_scheme, types.DictionaryType):
                 arguments_scheme = [{key: value} for key, value in
@@ -32,6 +132,7 @@ class MuranoMethod(object):
                 self._arguments_scheme[name] = typespec.ArgumentSpec(
                     record[name], self._namespace_resolver)
 
+        self._binder = ArgumentBinder(self._arguments_scheme)
         self._murano_class = murano_class
 
     @property
@@ -46,17 +147,26 @@ class MuranoMethod(object):
     def arguments_scheme(self):
         return self._arguments_scheme
 
+    @property
+    def binder(self):
+        return self._binder
+
     @property
     def body(self):
         return self._body
 
-    def _generate_arguments_scheme(self, func):
-        func_info = inspect.getargspec(func)
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @property
+    def max_steps(self):
+        return self._max_steps
+
+    def _generate_arguments_scheme(self, descriptor):
         data = [(name, {'Contract': YaqlExpression('$')})
-                for name in func_info.args]
-        if inspect.ismethod(func):
-            data = data[1:]
-        defaults = func_info.defaults or tuple()
+                for name in descriptor.arg_names]
+        defaults = descriptor.defaults
         for i in xrange(len(defaults)):
             data[i + len(data) - len(defaults)][1]['Default'] = defaults[i]
         result = OrderedDict([
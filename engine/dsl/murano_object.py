@@ -41,7 +41,7 @@ class MuranoObject(object):
         for i in xrange(2):
             for property_name in self.__type.properties:
                 spec = self.__type.get_property(property_name)
-                if i == 0 and helpers.needs_evaluation(spec.default) \
+                if i == 0 and spec.default_needs_evaluation \
                         or i == 1 and property_name in used_names:
                     continue
                 used_names.add(property_name)
@@ -115,16 +115,8 @@ class MuranoObject(object):
     def __set_property(self, key, value, caller_class=None):
         if key in self.__type.properties:
             spec = self.__type.get_property(key)
-            if caller_class is not None and (
-                            spec.type not in typespec.PropertyTypes.Writable or
-                        not caller_class.is_compatible(self)):
-                raise exceptions.NoWriteAccess(key)
-
-            default = self.__defaults.get(key, spec.default)
-            child_context = Context(parent_context=self.__context)
-            child_context.set_data(self)
-            default = helpers.evaluate(default, child_context, 1)
-
+            self.__check_write_access(key, spec, caller_class)
+            default = self.__get_default(key, spec)
             self.__properties[key] = spec.validate(
                 value, self, self.__context, self.__object_store, default)
         else:
@@ -136,6 +128,56 @@ class MuranoObject(object):
                     continue
             raise AttributeError(key)
 
+    def validate_property_item(self, key, path, value, caller_class=None):
+        # Validates value for the item at path (dict keys and list indexes)
+        # inside property key without re-validating the rest of the
+        # property. Returns the item key and value to store, or None when
+        # the whole property has to be set again instead
+        try:
+            return self.__validate_property_item(
+                key, path, value, caller_class)
+        except AttributeError as e:
+            if not caller_class:
+                raise e
+            try:
+                self.cast(caller_class)
+            except TypeError:
+                raise AttributeError(key)
+            return path[-1], value
+
+    def __validate_property_item(self, key, path, value, caller_class):
+        if key in self.__type.properties:
+            spec = self.__type.get_property(key)
+            self.__check_write_access(key, spec, caller_class)
+            default = self.__get_default(key, spec)
+            return spec.validate_item(
+                path, value, self, self.__context, self.__object_store,
+                default)
+        for parent in self.__parents.values():
+            try:
+                return parent.__validate_property_item(
+                    key, path, value, caller_class)
+            except AttributeError:
+                continue
+        raise AttributeError(key)
+
+    def __check_write_access(self, key, spec, caller_class):
+        if caller_class is not None and (
+                spec.type not in typespec.PropertyTypes.Writable or
+                not caller_class.is_compatible(self)):
+            raise exceptions.NoWriteAccess(key)
+
+    def __get_default(self, key, spec):
+        if key in self.__defaults:
+            child_context = Context(parent_context=self.__context)
+            child_context.set_data(self)
+            return helpers.evaluate(self.__defaults[key], child_context, 1)
+        elif spec.default_needs_evaluation:
+            child_context = Context(parent_context=self.__context)
+            child_context.set_data(self)
+            return spec.evaluate_default(child_context)
+        return spec.evaluate_default(None)
+
     def cast(self, type):
         if self.type == type:
             return self
@@ -1,4 +1,3 @@
-import inspect
 import helpers
 
 
@@ -46,19 +45,19 @@ class ObjectStore(object):
                                 object_id=object_id, defaults=defaults)
             self._store[object_id] = obj
 
-        argspec = inspect.getargspec(obj.initialize).args
-        if '_context' in argspec:
+        initializer = obj.type.initializer
+        if initializer.takes_context:
             value['_context'] = context
-        if '_parent' in argspec:
+        if initializer.takes_parent:
             value['_parent'] = parent
 
         try:
             if parent is None:
                 self._initializing = True
-            obj.initialize(**value)
+            initializer(obj, value)
             if parent is None:
                 self._initializing = False
-                obj.initialize(**value)
+                initializer(obj, value)
         finally:
             if parent is None:
                 self._initializing = False
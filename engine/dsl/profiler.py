@@ -0,0 +1,164 @@
+import collections
+import contextlib
+import functools
+import json
+import time
+
+import eventlet
+
+# profilers that are recording. Contexts are only searched for the
+# profiler of their deployment while there are any
+_running = []
+
+
+def active(context):
+    if not _running or context is None:
+        return None
+    return context.get_data('$?profiler')
+
+
+class _Frame(object):
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.start = time.time()
+        self.child_time = 0.0
+        self.blocked_time = 0.0
+
+
+class _Statistics(object):
+    def __init__(self):
+        self.calls = 0
+        self.inclusive_time = 0.0
+        self.exclusive_time = 0.0
+        self.blocked_time = 0.0
+
+    def to_dictionary(self):
+        return {
+            'calls': self.calls,
+            'inclusiveTime': self.inclusive_time,
+            'exclusiveTime': self.exclusive_time,
+            'blockedTime': self.blocked_time
+        }
+
+
+class Profiler(object):
+    def __init__(self):
+        self._stacks = {}
+        self._statistics = collections.defaultdict(_Statistics)
+        self._collapsed = collections.defaultdict(float)
+
+    def start(self):
+        if self not in _running:
+            _running.append(self)
+
+    def stop(self):
+        if self in _running:
+            _running.remove(self)
+
+    def is_tracing(self, thread):
+        return thread in self._stacks
+
+    def enter(self, name):
+        stack = self._get_stack()
+        path = stack[-1].path if stack else self._get_parent_path()
+        stack.append(_Frame(name, path + (name,)))
+
+    def leave(self):
+        stack = self._get_stack()
+        frame = stack.pop()
+        elapsed = time.time() - frame.start
+        exclusive = elapsed - frame.child_time
+        stats = self._statistics[frame.name]
+        stats.calls += 1
+        stats.exclusive_time += exclusive
+        if not any(t.name == frame.name for t in stack):
+            stats.inclusive_time += elapsed
+            stats.blocked_time += frame.blocked_time
+        self._collapsed[frame.path] += exclusive
+        if stack:
+            stack[-1].child_time += elapsed
+            stack[-1].blocked_time += frame.blocked_time
+        else:
+            del self._stacks[eventlet.greenthread.getcurrent()]
+
+    def add_blocked_time(self, seconds):
+        stack = self._stacks.get(eventlet.greenthread.getcurrent())
+        if stack:
+            stack[-1].blocked_time += seconds
+
+    def report(self):
+        return dict((name, stats.to_dictionary())
+                    for name, stats in self._statistics.iteritems())
+
+    def write_report(self, filename):
+        with open(filename, 'w') as file:
+            file.write(json.dumps(self.report(), indent=True))
+
+    def write_collapsed_stacks(self, filename):
+        with open(filename, 'w') as file:
+            for path, seconds in sorted(self._collapsed.iteritems()):
+                file.write('%s %d\n' % (
+                    ';'.join(_sanitize(t) for t in path),
+                    int(seconds * 1000000)))
+
+    def _get_parent_path(self):
+        # green threads spawned by the deployment continue the stack of
+        # the thread that spawned them, so that their time is charged to
+        # the caller in the collapsed stacks
+        thread = getattr(eventlet.greenthread.getcurrent(),
+                         '_murano_parent', None)
+        while thread is not None:
+            stack = self._stacks.get(thread)
+            if stack:
+                return stack[-1].path
+            thread = getattr(thread, '_murano_parent', None)
+        return ()
+
+    def _get_stack(self):
+        current_thread = eventlet.greenthread.getcurrent()
+        stack = self._stacks.get(current_thread)
+        if stack is None:
+            stack = self._stacks[current_thread] = []
+        return stack
+
+
+def _sanitize(name):
+    return ' '.join(name.replace(';', ',').split())
+
+
+def trace(name):
+    def decorator(func):
+        # for execute(self, context, murano_class) of DSL expressions
+        @functools.wraps(func)
+        def wrapper(self, context, *args, **kwargs):
+            profiler = active(context)
+            if profiler is None:
+                return func(self, context, *args, **kwargs)
+            profiler.enter(name)
+            try:
+                return func(self, context, *args, **kwargs)
+            finally:
+                profiler.leave()
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def blocked():
+    # for system classes waiting on the outside world, they have no
+    # context at hand. The thread tells which deployment waits
+    current_thread = eventlet.greenthread.getcurrent()
+    profiler = None
+    for t in _running:
+        if t.is_tracing(current_thread):
+            profiler = t
+            break
+    if profiler is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        profiler.add_blocked_time(time.time() - start)
@@ -0,0 +1,225 @@
+import collections
+import contextlib
+import sys
+
+import eventlet
+import eventlet.event
+import eventlet.semaphore
+from eventlet import greenthread
+import greenlet
+
+
+class TaskPool(object):
+    # Green threads of Parallel blocks, pselect and psuper shared by all
+    # deployments of the process. At most size tasks run at once and at
+    # most quota of them belong to the same deployment
+    def __init__(self, size=1000, quota=250):
+        self._size = size
+        self._quota = quota
+        self._slots = eventlet.semaphore.Semaphore(size)
+        self.running = 0
+        self.queued = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def quota(self):
+        return self._quota
+
+    def create_group(self):
+        return TaskGroup(self, self._quota)
+
+    def statistics(self):
+        return {
+            'size': self._size,
+            'quota': self._quota,
+            'running': self.running,
+            'queued': self.queued
+        }
+
+
+class TaskGroup(object):
+    # Tasks of one deployment. Every green thread the deployment runs on is
+    # tracked here so that the deployment can be cancelled as a whole
+    def __init__(self, pool, quota):
+        self._pool = pool
+        self._slots = eventlet.semaphore.Semaphore(quota)
+        self._threads = collections.OrderedDict()
+        self._cancelled = False
+        self.running = 0
+        self.queued = 0
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def spawn(self, func, *args, **kwargs):
+        return self._spawn(self._run, None, func, args, kwargs)
+
+    def spawn_unpooled(self, func, *args, **kwargs):
+        # For threads that do not add to the fan-out of the deployment:
+        # method bodies the caller waits for and long-lived listeners
+        return self._spawn(func, *args, **kwargs)
+
+    def track(self, thread):
+        if self._cancelled:
+            raise greenlet.GreenletExit()
+        self._threads[thread] = None
+        thread.link(self._forget)
+        return thread
+
+    def cancel(self):
+        # Kills every thread of the group, the oldest first. Killed threads
+        # unwind and kill the tasks they wait for on their way
+        self._cancelled = True
+        while self._threads:
+            thread, _ = self._threads.popitem(last=False)
+            thread.kill()
+
+    def map(self, func, iterable, limit=None, cancel_on_error=False):
+        # Results of func for every item in order. At most limit items are
+        # processed at once
+        semaphore = None
+        if limit is not None:
+            semaphore = eventlet.semaphore.Semaphore(limit)
+        return self.wait([
+            self._spawn(self._run, semaphore, func, (t,), {})
+            for t in iterable], cancel_on_error)
+
+    def wait(self, threads, cancel_on_error=False):
+        # Results of threads in order. Failures are re-raised only after
+        # every thread has finished, the first one wins. With
+        # cancel_on_error the first failure kills the remaining threads
+        # and is re-raised at once
+        results = []
+        error = None
+        with released_slot():
+            try:
+                if cancel_on_error:
+                    error = _wait_first_error(threads)
+                if error is None:
+                    for thread in threads:
+                        try:
+                            results.append(thread.wait())
+                        except Exception:
+                            if error is None:
+                                error = sys.exc_info()
+            except BaseException:
+                # the waiting task is interrupted (killed or timed out),
+                # the tasks it waits for must not outlive it
+                for thread in threads:
+                    thread.kill()
+                raise
+            if error is not None:
+                for thread in threads:
+                    thread.kill()
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return results
+
+    def statistics(self):
+        return {
+            'running': self.running,
+            'queued': self.queued,
+            'threads': len(self._threads)
+        }
+
+    def _spawn(self, func, *args, **kwargs):
+        # checked before spawning, a thread that is never tracked would
+        # survive the cancellation
+        if self._cancelled:
+            raise greenlet.GreenletExit()
+        thread = self.track(eventlet.spawn(func, *args, **kwargs))
+        # lets the profiler charge the thread to its caller
+        thread._murano_parent = greenthread.getcurrent()
+        return thread
+
+    def _forget(self, thread):
+        self._threads.pop(thread, None)
+
+    def _run(self, semaphore, func, args, kwargs):
+        current = greenthread.getcurrent()
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            self._acquire()
+            current._murano_task_group = self
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if current._murano_task_group is self:
+                    current._murano_task_group = None
+                    self._release()
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    def _acquire(self):
+        self.queued += 1
+        self._pool.queued += 1
+        try:
+            self._slots.acquire()
+            try:
+                self._pool._slots.acquire()
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self.queued -= 1
+            self._pool.queued -= 1
+        self.running += 1
+        self._pool.running += 1
+
+    def _release(self):
+        self.running -= 1
+        self._pool.running -= 1
+        self._pool._slots.release()
+        self._slots.release()
+
+
+default_pool = TaskPool()
+
+
+@contextlib.contextmanager
+def released_slot():
+    # A task blocked on other tasks or on a method lock gives its slot back
+    # for the time it waits, otherwise nested Parallel blocks could hold
+    # every slot while waiting for tasks that never get one. A task that
+    # is killed while waiting does not queue for the slot again
+    current = greenthread.getcurrent()
+    group = getattr(current, '_murano_task_group', None)
+    if group is None:
+        yield
+        return
+    current._murano_task_group = None
+    group._release()
+    yield
+    group._acquire()
+    current._murano_task_group = group
+
+
+def _wait_first_error(threads):
+    # Blocks until every thread has finished or one of them has failed.
+    # Returns exc_info of the failure if any
+    pending = set(threads)
+    errors = []
+    done = eventlet.event.Event()
+
+    def finished(thread):
+        pending.discard(thread)
+        try:
+            thread.wait()
+        except Exception:
+            errors.append(sys.exc_info())
+        if (errors or not pending) and not done.ready():
+            done.send()
+
+    for thread in threads:
+        thread.link(finished)
+    if threads:
+        done.wait()
+    for thread in threads:
+        thread.unlink(finished)
+    return errors[0] if errors else None
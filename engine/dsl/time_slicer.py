@@ -0,0 +1,101 @@
+import collections
+
+import eventlet
+from eventlet import greenthread
+
+import exceptions
+
+
+class LoopStatistics(object):
+    def __init__(self):
+        self.executions = 0
+        self.iterations = 0
+        self.yields = 0
+
+    def to_dictionary(self):
+        return {
+            'executions': self.executions,
+            'iterations': self.iterations,
+            'yields': self.yields
+        }
+
+
+class TimeSlicer(object):
+    # Counts statements executed by the loops of a deployment and yields to
+    # other green threads every time budget of them were executed, so that
+    # loops that do no I/O cannot freeze the rest of the process
+    def __init__(self, budget=None):
+        self._budget = budget
+        self._steps = 0
+        self._statistics = collections.defaultdict(LoopStatistics)
+
+    @property
+    def budget(self):
+        return self._budget
+
+    def statistics(self):
+        return dict((name, stats.to_dictionary())
+                    for name, stats in self._statistics.iteritems())
+
+    def enter(self, name):
+        stats = self._statistics[name]
+        stats.executions += 1
+        return stats
+
+    def step(self, statements, stats):
+        stats.iterations += 1
+        if not self._budget:
+            return
+        self._steps += statements
+        if self._steps >= self._budget:
+            self._steps = 0
+            stats.yields += 1
+            eventlet.sleep(0)
+
+
+class StepBudget(object):
+    # Statements that the loops of one method call may execute
+    def __init__(self, method_name, max_steps):
+        self._method_name = method_name
+        self._max_steps = max_steps
+        self._steps = 0
+
+    def spend(self, statements):
+        self._steps += statements
+        if self._steps > self._max_steps:
+            raise exceptions.StepLimitExceeded(
+                self._method_name, self._max_steps)
+
+
+def start_method_timer(seconds):
+    # yaql 0.2.3 turns anything raised while it evaluates a function
+    # argument into a YaqlExecutionException, eventlet.Timeout included,
+    # and tries the next overload, which evaluates the argument again.
+    # The timers of the method calls a thread is in are therefore kept
+    # with the thread, so that an expired one is raised again wherever
+    # the DSL regains control instead of running on without it
+    timer = eventlet.Timeout(seconds)
+    current = greenthread.getcurrent()
+    timers = getattr(current, '_murano_method_timers', None)
+    if timers is None:
+        timers = current._murano_method_timers = []
+    timers.append(timer)
+    return timer
+
+
+def stop_method_timer(timer):
+    greenthread.getcurrent()._murano_method_timers.remove(timer)
+    timer.cancel()
+
+
+def is_expired(timer):
+    # only valid before stop_method_timer, a cancelled timer is not
+    # pending either
+    return not timer.pending
+
+
+def check_method_timers():
+    for timer in getattr(greenthread.getcurrent(),
+                         '_murano_method_timers', ()):
+        if is_expired(timer):
+            raise timer
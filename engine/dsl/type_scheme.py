@@ -1,10 +1,13 @@
+import collections
 import types
 import sys
 import uuid
 import helpers
 import murano_object
+import yaql_expression
 from yaql_expression import YaqlExpression
-from yaql.context import Context, EvalArg
+from yaql.context import Context, ContextAware, EvalArg
+import yaql.expressions
 
 NoValue = object()
 
@@ -14,154 +17,35 @@ class TypeScheme(object):
         def __init__(self, object_id):
             self.object_id = object_id
 
+    class Frame(object):
+        # Per-call state of the contract functions. The functions themselves
+        # are registered once per root context and find the frame in the
+        # context they are called with
+        __slots__ = ('root_context', 'this', 'object_store',
+                     'namespace_resolver', 'default', 'levels',
+                     'native_leaves')
+
+        def __init__(self, root_context, this, object_store,
+                     namespace_resolver, default):
+            self.root_context = root_context
+            self.this = this
+            self.object_store = object_store
+            self.namespace_resolver = namespace_resolver
+            self.default = default
+            self.levels = None
+            self.native_leaves = None
+
     def __init__(self, spec):
         self._spec = spec
+        self._native_leaves = {}
 
     @staticmethod
     def prepare_context(root_context, this, object_store,
                         namespace_resolver, default):
-        def _int(value):
-            value = value()
-            if value is NoValue:
-                value = default
-            if value is None:
-                return None
-            try:
-                return int(value)
-            except Exception:
-                raise TypeError()
-
-        def _string(value):
-            value = value()
-            if value is NoValue:
-                value = default
-            if value is None:
-                return None
-            try:
-                return unicode(value)
-            except Exception:
-                raise TypeError()
-
-        def _bool(value):
-            value = value()
-            if value is NoValue:
-                value = default
-            if value is None:
-                return None
-            return True if value else False
-
-        def _not_null(value):
-            value = value()
-
-            if isinstance(value, TypeScheme.ObjRef):
-                return value
-
-            if value is None:
-                raise TypeError()
-            return value
-
-        def _error():
-            raise TypeError()
-
-        def _check(value, predicate):
-            value = value()
-            if isinstance(value, TypeScheme.ObjRef) or predicate(value):
-                return value
-            else:
-                raise TypeError(value)
-
-        @EvalArg('obj', arg_type=(murano_object.MuranoObject,
-                                  TypeScheme.ObjRef, types.NoneType))
-        def _owned(obj):
-            if isinstance(obj, TypeScheme.ObjRef):
-                return obj
-
-            if obj is None:
-                return None
-            elif obj.parent is this:
-                return obj
-            else:
-                raise TypeError()
-
-        @EvalArg('obj', arg_type=(murano_object.MuranoObject,
-                                  TypeScheme.ObjRef, types.NoneType))
-        def _not_owned(obj):
-            if isinstance(obj, TypeScheme.ObjRef):
-                return obj
-
-            if obj is None:
-                return None
-            elif obj.parent is this:
-                raise TypeError()
-            else:
-                return obj
-
-        @EvalArg('name', arg_type=str)
-        def _class(value, name):
-            return _class2(value, name, None)
-
-        @EvalArg('name', arg_type=str)
-        @EvalArg('default_name', arg_type=(str, types.NoneType))
-        def _class2(value, name, default_name):
-            name = namespace_resolver.resolve_name(name)
-            if not default_name:
-                default_name = name
-            else:
-                default_name = namespace_resolver.resolve_name(default_name)
-            value = value()
-            if value is NoValue:
-                value = default
-                if isinstance(default, types.DictionaryType):
-                    value = {'?': {
-                        'id': uuid.uuid4().hex,
-                        'type': default_name
-                    }}
-            class_loader = helpers.get_class_loader(root_context)
-            murano_class = class_loader.get_class(name)
-            if not murano_class:
-                raise TypeError()
-            if value is None:
-                return None
-            if isinstance(value, murano_object.MuranoObject):
-                obj = value
-            elif isinstance(value, types.DictionaryType):
-                obj = object_store.load(value, this, root_context,
-                                        defaults=default)
-            elif isinstance(value, types.StringTypes):
-                obj = object_store.get(value)
-                if obj is None:
-                    if not object_store.initializing:
-                        raise TypeError('Object %s not found' % value)
-                    else:
-                        return TypeScheme.ObjRef(value)
-            else:
-                raise TypeError()
-            if not murano_class.is_compatible(obj):
-                raise TypeError()
-            return obj
-
-        @EvalArg('prefix', str)
-        @EvalArg('name', str)
-        def _validate(prefix, name):
-            return namespace_resolver.resolve_name(
-                '%s:%s' % (prefix, name))
+        return _create_frame_context(TypeScheme.Frame(
+            root_context, this, object_store, namespace_resolver, default))
 
-        context = Context(parent_context=root_context)
-        context.register_function(_validate, '#validate')
-        context.register_function(_int, 'int')
-        context.register_function(_string, 'string')
-        context.register_function(_bool, 'bool')
-        context.register_function(_check, 'check')
-        context.register_function(_not_null, 'notNull')
-        context.register_function(_error, 'error')
-        context.register_function(_class, 'class')
-        context.register_function(_class2, 'class')
-        context.register_function(_owned, 'owned')
-        context.register_function(_not_owned, 'notOwned')
-        return context
-
-
-    def _map_dict(self, data, spec, context):
+    def _map_dict(self, data, spec, frame, depth):
         if data is None or data is NoValue:
             data = {}
         if not isinstance(data, types.DictionaryType):
@@ -177,19 +61,19 @@ class TypeScheme(object):
                 else:
                     yaql_key = key
             else:
-                result[key] = self._map(data.get(key), value, context)
+                result[key] = self._map(data.get(key), value, frame, depth)
 
         if yaql_key is not None:
             yaql_value = spec[yaql_key]
             for key, value in data.iteritems():
                 if key in result:
                     continue
-                result[self._map(key, yaql_key, context)] = \
-                    self._map(value, yaql_value, context)
+                result[self._map(key, yaql_key, frame, depth)] = \
+                    self._map(value, yaql_value, frame, depth)
 
         return result
 
-    def _map_list(self, data, spec, context):
+    def _map_list(self, data, spec, frame, depth):
         if not isinstance(data, types.ListType):
             if data is None or data is NoValue:
                 data = []
@@ -198,16 +82,7 @@ class TypeScheme(object):
         if len(spec) < 1:
             return data
         result = []
-        shift = 0
-        max_length = sys.maxint
-        min_length = 0
-        if isinstance(spec[-1], types.IntType):
-            min_length = spec[-1]
-            shift += 1
-        if len(spec) >= 2 and isinstance(spec[-2], types.IntType):
-            max_length = min_length
-            min_length = spec[-2]
-            shift += 1
+        shift, min_length, max_length = _get_list_bounds(spec)
 
         if not min_length <= len(data) <= max_length:
             raise TypeError()
@@ -215,7 +90,7 @@ class TypeScheme(object):
         for index, item in enumerate(data):
             spec_item = spec[-1 - shift] \
                 if index >= len(spec) - shift else spec[index]
-            result.append(self._map(item, spec_item, context))
+            result.append(self._map(item, spec_item, frame, depth))
         return result
 
     def _map_scalar(self, data, spec):
@@ -224,15 +99,30 @@ class TypeScheme(object):
         else:
             return data
 
-    def _map(self, data, spec, context):
-        child_context = Context(parent_context=context)
+    def _map(self, data, spec, frame, depth):
         if isinstance(spec, YaqlExpression):
-            child_context.set_data(data)
-            return spec.evaluate(context=child_context)
+            validate = frame.native_leaves.get(spec)
+            if validate is not None:
+                return validate(data, frame.root_context, frame.this,
+                                frame.object_store, frame.namespace_resolver,
+                                frame.default)
+            # one context per nesting level of the contract: values on the
+            # same level are evaluated one after another and can share it
+            levels = frame.levels
+            while len(levels) <= depth:
+                levels.append(Context(parent_context=levels[-1]))
+            context = levels[depth]
+            context.set_data(data)
+            result = spec.evaluate(context=context)
+            if isinstance(result, collections.Iterator):
+                # a lazy result reads $ when it is consumed, the next
+                # value on this level gets a context of its own
+                levels[depth] = Context(parent_context=levels[depth - 1])
+            return result
         elif isinstance(spec, types.DictionaryType):
-            return self._map_dict(data, spec, child_context)
+            return self._map_dict(data, spec, frame, depth + 1)
         elif isinstance(spec, types.ListType):
-            return self._map_list(data, spec, child_context)
+            return self._map_list(data, spec, frame, depth + 1)
         elif isinstance(spec, (types.IntType,
                                types.StringTypes,
                                types.NoneType)):
@@ -240,10 +130,435 @@ class TypeScheme(object):
 
     def __call__(self, data, context, this, object_store,
                  namespace_resolver, default):
-        context = self.prepare_context(
-            context, this, object_store, namespace_resolver,
-            default)
-        result = self._map(data, self._spec, context)
+        frame = self._create_frame(
+            context, this, object_store, namespace_resolver, default)
+        result = self._map(data, self._spec, frame, 1)
         if result is NoValue:
             raise TypeError('No type specified')
         return result
+
+    def map_item(self, path, data, context, this, object_store,
+                 namespace_resolver, default):
+        # Validates data as the item at path (dict keys and list indexes)
+        # of a value that already satisfies the contract. Returns the key
+        # and value to store there, or None when the contract of the item
+        # cannot be told apart and the whole value has to be validated
+        spec = self._spec
+        key = path[-1]
+        frame = self._create_frame(
+            context, this, object_store, namespace_resolver, default)
+        for index, step in enumerate(path):
+            if isinstance(spec, types.DictionaryType):
+                if not spec:
+                    return key, data
+                if step in spec:
+                    spec = spec[step]
+                    continue
+                yaql_keys = [t for t in spec if isinstance(t, YaqlExpression)]
+                if len(yaql_keys) != 1:
+                    return None
+                if index == len(path) - 1:
+                    key = self._map(step, yaql_keys[0], frame, 1)
+                spec = spec[yaql_keys[0]]
+            elif isinstance(spec, types.ListType):
+                if not spec:
+                    return key, data
+                shift = _get_list_bounds(spec)[0]
+                if len(spec) - shift < 1 or \
+                        not isinstance(step, types.IntType):
+                    return None
+                spec = spec[-1 - shift] \
+                    if step >= len(spec) - shift else spec[step]
+            elif isinstance(spec, YaqlExpression) and \
+                    _is_data_reference(spec.parsed_expression):
+                return key, data
+            else:
+                return None
+        return key, self._map(data, spec, frame, 1)
+
+    def _create_frame(self, context, this, object_store, namespace_resolver,
+                      default):
+        frame = TypeScheme.Frame(
+            context, this, object_store, namespace_resolver, default)
+        frame.levels = [_create_frame_context(frame)]
+        frame.native_leaves = self._get_native_leaves(namespace_resolver)
+        return frame
+
+    def _get_native_leaves(self, namespace_resolver):
+        # expressions of the contract that can be validated without yaql,
+        # compiled once per namespace resolver
+        leaves = self._native_leaves.get(namespace_resolver)
+        if leaves is None:
+            leaves = self._native_leaves[namespace_resolver] = {}
+            _collect_native_leaves(self._spec, namespace_resolver, leaves)
+        return leaves
+
+
+def _get_list_bounds(spec):
+    # trailing integers of a list contract are its length bounds
+    shift = 0
+    max_length = sys.maxint
+    min_length = 0
+    if spec and isinstance(spec[-1], types.IntType):
+        min_length = spec[-1]
+        shift += 1
+    if len(spec) >= 2 and isinstance(spec[-2], types.IntType):
+        max_length = min_length
+        min_length = spec[-2]
+        shift += 1
+    return shift, min_length, max_length
+
+
+def _create_frame_context(frame):
+    # kept on the root context itself: a cache keyed by root contexts
+    # would keep every executor alive through the parent of its value
+    root_context = frame.root_context
+    function_context = getattr(root_context, 'contract_functions', None)
+    if function_context is None:
+        function_context = _create_function_context(root_context)
+        root_context.contract_functions = function_context
+    context = Context(parent_context=function_context)
+    context.set_data(frame, '?contractFrame')
+    return context
+
+
+def _collect_native_leaves(spec, namespace_resolver, leaves):
+    if isinstance(spec, YaqlExpression):
+        validate = _compile_native(spec.parsed_expression, namespace_resolver)
+        if validate is not None:
+            leaves[spec] = validate
+    elif isinstance(spec, types.DictionaryType):
+        for key, value in spec.iteritems():
+            _collect_native_leaves(key, namespace_resolver, leaves)
+            _collect_native_leaves(value, namespace_resolver, leaves)
+    elif isinstance(spec, types.ListType):
+        for t in spec:
+            _collect_native_leaves(t, namespace_resolver, leaves)
+
+
+def _get_frame(context):
+    return context.get_data('$?contractFrame')
+
+
+@ContextAware()
+def _int(context, value):
+    return _to_int(value(), _get_frame(context).default)
+
+
+def _to_int(value, default):
+    if value is NoValue:
+        value = default
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except Exception:
+        raise TypeError()
+
+
+@ContextAware()
+def _string(context, value):
+    return _to_string(value(), _get_frame(context).default)
+
+
+def _to_string(value, default):
+    if value is NoValue:
+        value = default
+    if value is None:
+        return None
+    try:
+        return unicode(value)
+    except Exception:
+        raise TypeError()
+
+
+@ContextAware()
+def _bool(context, value):
+    return _to_bool(value(), _get_frame(context).default)
+
+
+def _to_bool(value, default):
+    if value is NoValue:
+        value = default
+    if value is None:
+        return None
+    return True if value else False
+
+
+def _not_null(value):
+    return _check_not_null(value())
+
+
+def _check_not_null(value):
+    if isinstance(value, TypeScheme.ObjRef):
+        return value
+
+    if value is None:
+        raise TypeError()
+    return value
+
+
+def _error():
+    raise TypeError()
+
+
+def _check(value, predicate):
+    value = value()
+    if isinstance(value, TypeScheme.ObjRef) or predicate(value):
+        return value
+    else:
+        raise TypeError(value)
+
+
+def _is_object_reference(obj):
+    # murano_object is still being imported when this module loads, so the
+    # type check cannot be an arg_type of EvalArg
+    return obj is None or isinstance(
+        obj, (murano_object.MuranoObject, TypeScheme.ObjRef))
+
+
+@EvalArg('obj', custom_validator=_is_object_reference)
+@ContextAware()
+def _owned(context, obj):
+    if isinstance(obj, TypeScheme.ObjRef):
+        return obj
+
+    if obj is None:
+        return None
+    elif obj.parent is _get_frame(context).this:
+        return obj
+    else:
+        raise TypeError()
+
+
+@EvalArg('obj', custom_validator=_is_object_reference)
+@ContextAware()
+def _not_owned(context, obj):
+    if isinstance(obj, TypeScheme.ObjRef):
+        return obj
+
+    if obj is None:
+        return None
+    elif obj.parent is _get_frame(context).this:
+        raise TypeError()
+    else:
+        return obj
+
+
+@EvalArg('name', arg_type=str)
+@ContextAware()
+def _class(context, value, name):
+    return _load_class(context, value, name, None)
+
+
+@EvalArg('name', arg_type=str)
+@EvalArg('default_name', arg_type=(str, types.NoneType))
+@ContextAware()
+def _class2(context, value, name, default_name):
+    return _load_class(context, value, name, default_name)
+
+
+def _load_class(context, value, name, default_name):
+    frame = _get_frame(context)
+    namespace_resolver = frame.namespace_resolver
+    name = namespace_resolver.resolve_name(name)
+    if not default_name:
+        default_name = name
+    else:
+        default_name = namespace_resolver.resolve_name(default_name)
+    return _load_object(value(), name, default_name, frame.root_context,
+                        frame.this, frame.object_store, frame.default)
+
+
+def _load_object(value, name, default_name, root_context, this,
+                 object_store, default):
+    if value is NoValue:
+        value = default
+        if isinstance(default, types.DictionaryType):
+            value = {'?': {
+                'id': uuid.uuid4().hex,
+                'type': default_name
+            }}
+    class_loader = helpers.get_class_loader(root_context)
+    murano_class = class_loader.get_class(name)
+    if not murano_class:
+        raise TypeError()
+    if value is None:
+        return None
+    if isinstance(value, murano_object.MuranoObject):
+        obj = value
+    elif isinstance(value, types.DictionaryType):
+        obj = object_store.load(value, this, root_context, defaults=default)
+    elif isinstance(value, types.StringTypes):
+        obj = object_store.get(value)
+        if obj is None:
+            if not object_store.initializing:
+                raise TypeError('Object %s not found' % value)
+            else:
+                return TypeScheme.ObjRef(value)
+    else:
+        raise TypeError()
+    if not murano_class.is_compatible(obj):
+        raise TypeError()
+    return obj
+
+
+@EvalArg('prefix', str)
+@EvalArg('name', str)
+@ContextAware()
+def _validate(context, prefix, name):
+    return _get_frame(context).namespace_resolver.resolve_name(
+        '%s:%s' % (prefix, name))
+
+
+def _create_function_context(root_context):
+    context = Context(parent_context=root_context)
+    context.register_function(_validate, '#validate')
+    context.register_function(_int, 'int')
+    context.register_function(_string, 'string')
+    context.register_function(_bool, 'bool')
+    context.register_function(_check, 'check')
+    context.register_function(_not_null, 'notNull')
+    context.register_function(_error, 'error')
+    context.register_function(_class, 'class')
+    context.register_function(_class2, 'class')
+    context.register_function(_owned, 'owned')
+    context.register_function(_not_owned, 'notOwned')
+    return context
+
+
+def compile_native_contract(spec, namespace_resolver):
+    # Builds a validator with the signature of TypeScheme.__call__ for the
+    # common contract shapes: $, $.int(), $.string(), $.bool() and
+    # $.class(X), optionally followed by .notNull(), and lists of those.
+    # Returns None for any other contract
+    if isinstance(spec, YaqlExpression):
+        validate = _compile_native(spec.parsed_expression, namespace_resolver)
+        if validate is None:
+            return None
+
+        def validate_value(data, context, this, object_store,
+                           namespace_resolver, default):
+            result = validate(data, context, this, object_store,
+                              namespace_resolver, default)
+            if result is NoValue:
+                raise TypeError('No type specified')
+            return result
+        return validate_value
+    elif isinstance(spec, types.ListType):
+        return _compile_native_list(spec, namespace_resolver)
+    return None
+
+
+def _compile_native_list(spec, namespace_resolver):
+    shift, min_length, max_length = _get_list_bounds(spec)
+    if len(spec) - shift != 1 or not isinstance(spec[0], YaqlExpression):
+        return None
+    validate_item = _compile_native(
+        spec[0].parsed_expression, namespace_resolver)
+    if validate_item is None:
+        return None
+
+    def validate_list(data, context, this, object_store,
+                      namespace_resolver, default):
+        if not isinstance(data, types.ListType):
+            if data is None or data is NoValue:
+                data = []
+            else:
+                data = [data]
+        if not min_length <= len(data) <= max_length:
+            raise TypeError()
+        return [validate_item(t, context, this, object_store,
+                              namespace_resolver, default) for t in data]
+    return validate_list
+
+
+def _is_data_reference(node):
+    return type(node) is yaql.expressions.GetContextValue and \
+        type(node.path) is yaql.expressions.Constant and \
+        node.path.value == '$'
+
+
+def _get_data(data, context, this, object_store, namespace_resolver,
+              default):
+    return data
+
+
+def _get_constant_string(node):
+    if type(node) is yaql.expressions.Constant and \
+            isinstance(node.value, types.StringType):
+        return node.value
+    return None
+
+
+def _compile_native(node, namespace_resolver):
+    if _is_data_reference(node):
+        return _get_data
+    if type(node) is not yaql.expressions.Function or node.object is None:
+        return None
+
+    if node.name == 'notNull' and not node.args:
+        get_value = _compile_native(node.object, namespace_resolver)
+        if get_value is None:
+            return None
+        return _compile_native_method(
+            'notNull', yaql_expression.parse('$.notNull()'), get_value,
+            lambda value, context, this, object_store, default:
+            _check_not_null(value))
+
+    if not _is_data_reference(node.object):
+        return None
+    conversions = {'int': _to_int, 'string': _to_string, 'bool': _to_bool}
+    if node.name in conversions and not node.args:
+        convert = conversions[node.name]
+        return _compile_native_method(
+            node.name, node, _get_data,
+            lambda value, context, this, object_store, default:
+            convert(value, default))
+    elif node.name == 'class' and len(node.args) == 1:
+        try:
+            name = namespace_resolver.resolve_name(
+                _get_class_name(node.args[0], namespace_resolver))
+        except Exception:
+            # left for the interpreted contract to report
+            return None
+        return _compile_native_method(
+            'class', node, _get_data,
+            lambda value, context, this, object_store, default:
+            _load_object(value, name, name, context, this, object_store,
+                         default))
+    return None
+
+
+def _get_class_name(node, namespace_resolver):
+    name = _get_constant_string(node)
+    if name is not None:
+        return name
+    # prefixed names (ns:Name) are parsed as #validate(#operator_:(ns), Name)
+    if type(node) is yaql.expressions.Function and \
+            node.name == '#validate' and len(node.args) == 2 and \
+            type(node.args[0]) is yaql.expressions.UnaryOperator and \
+            node.args[0].name == '#operator_:':
+        prefix = _get_constant_string(node.args[0].object)
+        name = _get_constant_string(node.args[1])
+        if prefix is not None and name is not None:
+            return namespace_resolver.resolve_name(
+                '%s:%s' % (prefix, name))
+    raise ValueError()
+
+
+def _compile_native_method(name, node, get_value, method):
+    # yaql calls a method of that name instead when the value is an object
+    # whose class defines one. node evaluates the same call through yaql
+    # with the value as $ for that case
+    def call(data, context, this, object_store, namespace_resolver, default):
+        value = get_value(data, context, this, object_store,
+                          namespace_resolver, default)
+        if isinstance(value, murano_object.MuranoObject) and \
+                value.type.find_method(name):
+            child_context = Context(parent_context=TypeScheme.prepare_context(
+                context, this, object_store, namespace_resolver, default))
+            child_context.set_data(value)
+            return node.evaluate(context=child_context)
+        return method(value, context, this, object_store, default)
+    return call
@@ -1,3 +1,6 @@
+import sys
+
+import helpers
 import type_scheme
 
 
@@ -12,12 +15,20 @@ class PropertyTypes(object):
 
 
 class Spec(object):
+    default_depth = sys.maxint
+
     def __init__(self, declaration, namespace_resolver):
         self._namespace_resolver = namespace_resolver
         self._contract = type_scheme.TypeScheme(
             declaration['Contract'])
+        self._validate_contract = type_scheme.compile_native_contract(
+            declaration['Contract'], namespace_resolver) or self._contract
         self._default = declaration.get('Default')
         self._has_default = 'Default' in declaration
+        self._default_needs_evaluation = helpers.needs_evaluation(
+            self._default)
+        self._evaluate_default = helpers.compile_evaluator(
+            self._default, self.default_depth)
         self._type = declaration.get('Type') or 'In'
         if self._type not in PropertyTypes.All:
             raise SyntaxError('Unknown type {0}. Must be one of ({1})'.format(
@@ -26,13 +37,28 @@ class Spec(object):
     def validate(self, value, this, context,  object_store, default=None):
         if default is None:
             default = self.default
-        return self._contract(value, context, this, object_store,
-                              self._namespace_resolver, default)
+        return self._validate_contract(value, context, this, object_store,
+                                       self._namespace_resolver, default)
+
+    def validate_item(self, path, value, this, context, object_store,
+                      default=None):
+        if default is None:
+            default = self.default
+        return self._contract.map_item(path, value, context, this,
+                                       object_store, self._namespace_resolver,
+                                       default)
 
     @property
     def default(self):
         return self._default
 
+    @property
+    def default_needs_evaluation(self):
+        return self._default_needs_evaluation
+
+    def evaluate_default(self, context):
+        return self._evaluate_default(context)
+
     @property
     def has_default(self):
         return self._has_default
@@ -43,7 +69,7 @@ class Spec(object):
 
 
 class PropertySpec(Spec):
-    pass
+    default_depth = 1
 
 
 class ArgumentSpec(Spec):
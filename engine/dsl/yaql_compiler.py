@@ -0,0 +1,373 @@
+import collections
+import inspect
+import operator
+import types
+
+from yaql.context import Context
+import yaql.exceptions
+import yaql.expressions
+from yaql.functions import builtin
+
+import exceptions
+import murano_object
+
+
+_BINARY_OPERATORS = {
+    '<': (builtin.less_then, operator.lt),
+    '>': (builtin.greater_then, operator.gt),
+    '<=': (builtin.less_or_equals, operator.le),
+    '>=': (builtin.greater_or_equals, operator.ge),
+    '=': (builtin.equals, operator.eq),
+    '!=': (builtin.not_equals, operator.ne),
+    'in': (builtin.is_in, lambda a, b: a in b),
+    '+': (builtin.plus, operator.add),
+    '-': (builtin.minus, operator.sub),
+    '*': (builtin.multiply, operator.mul),
+    '/': (builtin.divide, operator.div)
+}
+
+_BOOLEAN_OPERATORS = {
+    'and': builtin._and,
+    'or': builtin._or
+}
+
+
+class FunctionTable(object):
+    # Function lookups of a class context. Valid as long as no functions
+    # are registered in the class context or its parents after creation
+    def __init__(self, context, murano_class, attribution, resolver):
+        self._context = context
+        self._functions = {}
+        self._invokers = {}
+        self.murano_class = murano_class
+        self.compiled = self._is_standard(attribution, resolver)
+
+    def get_functions(self, name, num_params):
+        key = (name, num_params)
+        functions = self._functions.get(key)
+        if functions is None:
+            functions = self._functions[key] = tuple(
+                self._context.get_functions(name, num_params))
+        return functions
+
+    def get_invokers(self, name, num_params):
+        key = (name, num_params)
+        invokers = self._invokers.get(key)
+        if invokers is None:
+            invokers = self._invokers[key] = tuple(
+                _Invoker(t) for t in self.get_functions(name, num_params))
+        return invokers
+
+    def _is_standard(self, attribution, resolver):
+        expected = [
+            ('#get_context_data', 1, (builtin.get_context_data,)),
+            ('#operator_.', 2, (attribution, builtin.collection_attribution,
+                                builtin.dict_attribution,
+                                builtin.obj_attribution)),
+            ('#resolve', 2, (resolver,)),
+            ('#wrap', 1, (builtin.wrap,)),
+            ('#operator_not', 1, (builtin._not,))
+        ]
+        for op, (function, _) in _BINARY_OPERATORS.iteritems():
+            expected.append(('#operator_' + op, 2, (function,)))
+        for op, function in _BOOLEAN_OPERATORS.iteritems():
+            expected.append(('#operator_' + op, 2, (function,)))
+        for name, num_params, functions in expected:
+            if self.get_functions(name, num_params) != functions:
+                return False
+        return True
+
+
+def find_function_table(context):
+    while context is not None:
+        table = getattr(context, 'function_table', None)
+        if table is not None:
+            return table
+        if context.functions:
+            return None
+        context = context.parent_context
+    return None
+
+
+def compile_expression(expression):
+    return _compile(expression)
+
+
+class _Invoker(object):
+    # Same argument processing as yaql.expressions.pre_process_args with
+    # the argument specs resolved once
+    def __init__(self, function):
+        self._function = function
+        self._context_aware = hasattr(function, 'is_context_aware')
+        self._requirements = []
+        requirements = getattr(function, 'arg_requirements', None)
+        if not requirements:
+            return
+        if self._context_aware:
+            arg_names = [t for t in function.context_aware.real_args
+                         if t != function.context_aware.context_parameter_name]
+        else:
+            arg_names = inspect.getargspec(function).args
+        for arg_name, requirement in requirements.iteritems():
+            self._requirements.append((
+                arg_names.index(arg_name), arg_name,
+                requirement.arg_type, requirement.custom_validator))
+
+    def __call__(self, context, args):
+        if self._requirements:
+            args = list(args)
+            for index, arg_name, arg_type, custom_validator in \
+                    self._requirements:
+                try:
+                    arg_val = args[index]()
+                except Exception:
+                    raise yaql.exceptions.YaqlExecutionException(
+                        "Unable to evaluate argument {0}".format(arg_name))
+                ok = True
+                if arg_type:
+                    ok = isinstance(arg_val, arg_type)
+                    if type(arg_val) == types.BooleanType:
+                        ok = ok and type(arg_val) == arg_type
+                if custom_validator:
+                    ok = ok and custom_validator(arg_val)
+                if not ok:
+                    raise yaql.exceptions.YaqlExecutionException(
+                        "Argument {0} is invalid".format(arg_name))
+                args[index] = arg_val
+        if self._context_aware:
+            return self._function(context, *args)
+        return self._function(*args)
+
+
+class _Thunk(object):
+    def __init__(self, function, context, table):
+        self._function = function
+        self._context = context
+        self._table = table
+
+    def __call__(self, *params):
+        if params:
+            self._context.set_data(params[0])
+            for i, param in enumerate(params):
+                self._context.set_data(param, '$' + str(i + 1))
+        return self._function(self._context, self._table)
+
+
+def _try_invoke(invokers, args, context):
+    for invoker in invokers:
+        try:
+            return invoker(context, args)
+        except yaql.exceptions.YaqlExecutionException:
+            continue
+    raise yaql.exceptions.YaqlExecutionException()
+
+
+def _compile(node):
+    func = _compile_fast(node)
+    if func is not None:
+        return func
+    elif isinstance(node, yaql.expressions.Function):
+        return _compile_function(node)
+    return _compile_interpreted(node)
+
+
+def _compile_fast(node):
+    node_type = type(node)
+    if node_type is yaql.expressions.Constant:
+        return _compile_constant(node)
+    elif node_type is yaql.expressions.GetContextValue and \
+            type(node.path) is yaql.expressions.Constant:
+        return _compile_context_value(node)
+    elif node_type is yaql.expressions.Att and \
+            type(node.args[0]) is yaql.expressions.Constant:
+        return _compile_attribution(node)
+    elif node_type is yaql.expressions.BinaryOperator:
+        op = node.name[len('#operator_'):]
+        if op in _BINARY_OPERATORS:
+            return _compile_binary_operator(node, _BINARY_OPERATORS[op][1])
+        elif op in _BOOLEAN_OPERATORS:
+            return _compile_boolean_operator(node, _BOOLEAN_OPERATORS[op])
+    elif node_type is yaql.expressions.UnaryOperator and \
+            node.name == '#operator_not':
+        return _compile_not(node)
+    elif node_type is yaql.expressions.Wrap:
+        return _compile_wrap(node)
+    return None
+
+
+def _compile_operand(node):
+    # yaql evaluates every function argument in a fresh child context.
+    # Fast nodes neither store data in it nor pass it on, so they skip it
+    func = _compile_fast(node)
+    if func is not None:
+        return func
+    func = _compile(node)
+    return lambda context, table: func(Context(context), table)
+
+
+def _compile_object(node):
+    # Returns (value, context) where context is what yaql would use as the
+    # parent context of a method called on that value
+    if type(node) is yaql.expressions.Constant:
+        value = node.value
+        return lambda context, table: (value, None)
+    func = _compile(node)
+    with_context = getattr(func, 'with_context', None)
+    if with_context is not None:
+        return with_context
+    return lambda context, table: (func(context, table), context)
+
+
+def _compile_interpreted(node):
+    def call(context, table):
+        callable = node.create_callable(context)
+        return callable(), callable.yaql_context
+
+    def interpreted(context, table):
+        return node.create_callable(context)()
+
+    interpreted.with_context = call
+    return interpreted
+
+
+def _compile_constant(node):
+    value = node.value
+    return lambda context, table: value
+
+
+def _compile_context_value(node):
+    path = node.path.value
+    return lambda context, table: context.get_data(path)
+
+
+def _compile_attribution(node):
+    get_obj = _compile(node.object)
+    name = node.args[0].value
+    name_is_str = isinstance(name, types.StringType)
+
+    def attribution(context, table):
+        this = get_obj(context, table)
+        if name_is_str and isinstance(this, murano_object.MuranoObject):
+            try:
+                return this.get_property(name, table.murano_class)
+            except yaql.exceptions.YaqlExecutionException:
+                pass
+        if isinstance(this, collections.Iterable) and not isinstance(
+                this, (types.DictionaryType, types.StringTypes)):
+            return builtin.collection_attribution(this, lambda: name)
+        elif isinstance(this, types.DictionaryType):
+            return this.get(name)
+        return getattr(this, name)
+
+    return attribution
+
+
+def _compile_binary_operator(node, func):
+    name = node.name
+    get_left = _compile_operand(node.args[0])
+    get_right = _compile_operand(node.args[1])
+
+    def binary_operator(context, table):
+        try:
+            return func(get_left(context, table), get_right(context, table))
+        except yaql.exceptions.YaqlExecutionException:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run ' + name)
+
+    return binary_operator
+
+
+def _compile_boolean_operator(node, func):
+    name = node.name
+    get_left = _compile_operand(node.args[0])
+    get_right = _compile_operand(node.args[1])
+
+    def evaluate_arg(get_arg, context, table):
+        try:
+            value = get_arg(context, table)
+        except Exception:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run ' + name)
+        if type(value) is not types.BooleanType:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run ' + name)
+        return value
+
+    def boolean_operator(context, table):
+        return func(evaluate_arg(get_left, context, table),
+                    evaluate_arg(get_right, context, table))
+
+    return boolean_operator
+
+
+def _compile_not(node):
+    get_obj = _compile(node.object)
+
+    def not_operator(context, table):
+        value = get_obj(context, table)
+        if type(value) is not types.BooleanType:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run #operator_not')
+        return not value
+
+    return not_operator
+
+
+def _compile_wrap(node):
+    get_value = _compile_operand(node.args[0])
+
+    def wrap(context, table):
+        try:
+            return get_value(context, table)
+        except yaql.exceptions.YaqlExecutionException:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run #wrap')
+
+    return wrap
+
+
+def _compile_function(node):
+    name = node.name
+    resolvable = not name.startswith('#')
+    has_obj = node.object is not None
+    get_obj = _compile_object(node.object) if has_obj else None
+    arg_funcs = [_compile(t) for t in node.args]
+    num_args = len(arg_funcs) + (1 if has_obj else 0)
+
+    def call(context, table):
+        this = None
+        args = []
+        if has_obj:
+            this, obj_context = get_obj(context, table)
+            args.append(lambda: this)
+            if obj_context is not None:
+                context = Context(obj_context)
+        for arg_func in arg_funcs:
+            args.append(_Thunk(arg_func, Context(context), table))
+
+        if resolvable and isinstance(this, murano_object.MuranoObject):
+            try:
+                executor = context.get_data('$?executor')
+                murano_class = context.get_data('$?type')
+                return executor.invoke_method(
+                    name, this, context, murano_class, *args[1:]), context
+            except (exceptions.NoMethodFound,
+                    exceptions.AmbiguousMethodName,
+                    yaql.exceptions.YaqlExecutionException):
+                invokers = table.get_invokers(name, num_args)
+        else:
+            invokers = table.get_invokers(name, num_args)
+            if not invokers:
+                raise yaql.exceptions.NoFunctionRegisteredException(
+                    name, num_args)
+        try:
+            return _try_invoke(invokers, args, context), context
+        except yaql.exceptions.YaqlExecutionException:
+            raise yaql.exceptions.YaqlExecutionException(
+                'Unable to run ' + name)
+
+    def function(context, table):
+        return call(context, table)[0]
+
+    function.with_context = call
+    return function
@@ -1,16 +1,143 @@
+import collections
 import yaql
 import yaql.exceptions
 import re
 import types
 
+import profiler
+import yaql_compiler
+
+
+class ParseCache(object):
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self._expressions = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value):
+        self._max_size = value
+        self._shrink()
+
+    def parse(self, expression):
+        parsed = self._expressions.pop(expression, None)
+        if parsed is None:
+            self.misses += 1
+            parsed = yaql.parse(expression)
+        else:
+            self.hits += 1
+        self._expressions[expression] = parsed
+        self._shrink()
+        return parsed
+
+    def clear(self):
+        self._expressions.clear()
+
+    def statistics(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._expressions),
+            'maxSize': self._max_size
+        }
+
+    def _shrink(self):
+        if self._max_size is None:
+            return
+        while len(self._expressions) > self._max_size:
+            self._expressions.popitem(last=False)
+            self.evictions += 1
+
+
+parse_cache = ParseCache()
+
+# Mirrors the token rules of yaql.lexer in the same priority order so that
+# ordinary strings can be rejected without running the yaql parser
+_TOKEN_RE = re.compile(r"""
+    (?P<space>[ \t]+)
+  | (?P<symbol>\b\w+:\w+\b)
+  | (?P<dollar>\$\w*)
+  | (?P<operator>\b(?:and|or|is|in)\b)
+  | (?P<not>\bnot\b)
+  | (?P<number>\b\d+(?:\.?\d+)?\b)
+  | (?P<func>\b\w+\()
+  | (?P<filter>(?<!\s)\[)
+  | (?P<string>\b\w+\b)
+  | (?P<quoted>'(?:[^'\\]|\\.)*')
+  | (?P<literal>>=|<=|!=|=>|[+\-*/.><=,])
+  | (?P<open>\()
+  | (?P<close>[)\]])
+""", re.VERBOSE)
+
+_OPERAND_START = frozenset(['symbol', 'dollar', 'not', 'number', 'func',
+                            'string', 'quoted', 'open'])
+_OPERAND_END = frozenset(['symbol', 'dollar', 'number', 'string', 'quoted',
+                          'close'])
+
+_MATCH_CACHE_SIZE = 10000
+_match_verdicts = {}
+
+
+def parse(expression):
+    return parse_cache.parse(str(expression))
+
+
+def _is_rejected_lexically(expr):
+    # True when expr either cannot be tokenized by yaql or contains two
+    # adjacent operands, which no yaql grammar rule accepts
+    position = 0
+    operand_end = False
+    length = len(expr)
+    while position < length:
+        token = _TOKEN_RE.match(expr, position)
+        if token is None:
+            return True
+        position = token.end()
+        kind = token.lastgroup
+        if kind == 'space':
+            continue
+        if operand_end and kind in _OPERAND_START:
+            return True
+        operand_end = kind in _OPERAND_END
+    return False
+
+
+def _match(expr):
+    if re.match('^[\s\w\d.:]*$', expr) or _is_rejected_lexically(expr):
+        return False
+    try:
+        try:
+            # seed the cache with the same str() key YaqlExpression uses
+            parse(expr)
+        except UnicodeError:
+            yaql.parse(expr)
+        return True
+    except yaql.exceptions.YaqlGrammarException:
+        return False
+    except yaql.exceptions.YaqlLexicalException:
+        return False
+
+
 class YaqlExpression(object):
     def __init__(self, expression):
         self._expression = str(expression)
-        self._parsed_expression = yaql.parse(self._expression)
+        self._parsed_expression = parse(self._expression)
+        self._compiled_expression = None
 
     def expression(self):
         return self._expression
 
+    @property
+    def parsed_expression(self):
+        return self._parsed_expression
+
     def __repr__(self):
         return 'YAQL(%s)' % self._expression
 
@@ -21,16 +148,29 @@ class YaqlExpression(object):
     def match(expr):
         if not isinstance(expr, types.StringTypes):
             return False
-        if re.match('^[\s\w\d.:]*$', expr):
-            return False
-        try:
-            yaql.parse(expr)
-            return True
-        except yaql.exceptions.YaqlGrammarException:
-            return False
-        except yaql.exceptions.YaqlLexicalException:
-            return False
+        verdict = _match_verdicts.get(expr)
+        if verdict is None:
+            if len(_match_verdicts) >= _MATCH_CACHE_SIZE:
+                _match_verdicts.clear()
+            verdict = _match_verdicts[expr] = _match(expr)
+        return verdict
 
     def evaluate(self, context=None):
-        return self._parsed_expression.evaluate(context=context)
+        active_profiler = profiler.active(context)
+        if active_profiler is None:
+            return self._evaluate(context)
+        active_profiler.enter(self._expression)
+        try:
+            return self._evaluate(context)
+        finally:
+            active_profiler.leave()
+
+    def _evaluate(self, context):
+        table = yaql_compiler.find_function_table(context)
+        if table is None or not table.compiled:
+            return self._parsed_expression.evaluate(context=context)
+        if self._compiled_expression is None:
+            self._compiled_expression = yaql_compiler.compile_expression(
+                self._parsed_expression)
+        return self._compiled_expression(context, table)
 
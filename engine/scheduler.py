@@ -0,0 +1,197 @@
+import collections
+import time
+
+import eventlet
+import eventlet.event
+import greenlet
+
+from engine.dsl.executor import MuranoDslExecutor
+import engine.dsl.results_serializer
+from engine.dsl import tasks
+from engine.enviroment import Environment
+from engine.openstack.common import log as logging
+
+log = logging.getLogger(__name__)
+
+
+class Deployment(object):
+    Queued = 'queued'
+    Running = 'running'
+    Completed = 'completed'
+    Failed = 'failed'
+    Cancelled = 'cancelled'
+
+    def __init__(self, deployment_id, tenant_id, token, model):
+        self.id = deployment_id
+        self.tenant_id = tenant_id
+        self.token = token
+        self.model = model
+        self.state = Deployment.Queued
+        self.result = None
+        self.error = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.executor = None
+        self.profiler = None
+        self.tracer = None
+        self.cancelled = False
+        self._done = eventlet.event.Event()
+
+    def wait(self):
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def finish(self):
+        self.finished_at = time.time()
+        self._done.send()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.executor is not None:
+            self.executor.cancel()
+
+    def to_dictionary(self):
+        now = time.time()
+        started_at = self.started_at or now
+        return {
+            'id': self.id,
+            'tenant': self.tenant_id,
+            'state': self.state,
+            'queueTime': started_at - self.queued_at,
+            'runTime': (self.finished_at or now) - started_at
+            if self.started_at else 0.0,
+            'locks': self.executor.lock_manager.statistics()
+            if self.executor else {},
+            'tasks': self.executor.task_group.statistics()
+            if self.executor else {},
+            'loops': self.executor.time_slicer.statistics()
+            if self.executor else {}
+        }
+
+
+class DeploymentScheduler(object):
+    def __init__(self, class_loader, max_concurrency, inline_calls=True,
+                 compile_expressions=True, task_pool=None,
+                 statements_per_yield=200, method_timeout=None,
+                 method_max_steps=None):
+        self._class_loader = class_loader
+        self._max_concurrency = max_concurrency
+        self._inline_calls = inline_calls
+        self._compile_expressions = compile_expressions
+        self._task_pool = task_pool or tasks.default_pool
+        self._statements_per_yield = statements_per_yield
+        self._method_timeout = method_timeout
+        self._method_max_steps = method_max_steps
+        self._tenant_queues = collections.OrderedDict()
+        # keyed by the deployment itself: ids are broker message ids and a
+        # redelivered message may run next to its first delivery
+        self._running = collections.OrderedDict()
+        self._finished = collections.deque(maxlen=100)
+
+    @property
+    def queued_count(self):
+        return sum(len(t) for t in self._tenant_queues.itervalues())
+
+    @property
+    def running_count(self):
+        return len(self._running)
+
+    @property
+    def task_pool(self):
+        return self._task_pool
+
+    def submit(self, deployment):
+        queue = self._tenant_queues.get(deployment.tenant_id)
+        if queue is None:
+            queue = self._tenant_queues[deployment.tenant_id] = \
+                collections.deque()
+        queue.append(deployment)
+        self._dispatch()
+        return deployment
+
+    def cancel(self, deployment_id):
+        running = [t for t in self._running if t.id == deployment_id]
+        for deployment in running:
+            deployment.cancel()
+        if running:
+            return True
+        for tenant_id, queue in self._tenant_queues.items():
+            for deployment in queue:
+                if deployment.id != deployment_id:
+                    continue
+                queue.remove(deployment)
+                if not queue:
+                    del self._tenant_queues[tenant_id]
+                deployment.cancelled = True
+                deployment.state = Deployment.Cancelled
+                self._finished.append(deployment)
+                deployment.finish()
+                return True
+        return False
+
+    def statistics(self):
+        return {
+            'queued': self.queued_count,
+            'running': self.running_count,
+            'tasks': self._task_pool.statistics(),
+            'deployments': [
+                t.to_dictionary() for t in
+                list(self._finished) + list(self._running)]
+        }
+
+    def _dispatch(self):
+        while self._tenant_queues and \
+                len(self._running) < self._max_concurrency:
+            tenant_id, queue = self._tenant_queues.popitem(last=False)
+            deployment = queue.popleft()
+            if queue:
+                self._tenant_queues[tenant_id] = queue
+            self._running[deployment] = None
+            eventlet.spawn(self._run, deployment)
+
+    def _run(self, deployment):
+        deployment.state = Deployment.Running
+        deployment.started_at = time.time()
+        try:
+            deployment.result = self._execute(deployment)
+            deployment.state = Deployment.Completed
+        except (Exception, greenlet.GreenletExit) as e:
+            if not deployment.cancelled:
+                log.exception(e)
+                deployment.error = e
+                deployment.state = Deployment.Failed
+        finally:
+            if deployment.cancelled:
+                deployment.state = Deployment.Cancelled
+            self._running.pop(deployment, None)
+            self._finished.append(deployment)
+            deployment.finish()
+            self._dispatch()
+
+    def _execute(self, deployment):
+        environment = Environment()
+        environment.tenant_id = deployment.tenant_id
+        environment.token = deployment.token
+        executor = deployment.executor = MuranoDslExecutor(
+            self._class_loader, environment, inline_calls=self._inline_calls,
+            compile_expressions=self._compile_expressions,
+            task_pool=self._task_pool,
+            statements_per_yield=self._statements_per_yield,
+            method_timeout=self._method_timeout,
+            method_max_steps=self._method_max_steps,
+            profiler=deployment.profiler,
+            tracer=deployment.tracer)
+        # the deployment is cancelled together with the threads it spawns
+        executor.task_group.track(eventlet.greenthread.getcurrent())
+        if deployment.cancelled:
+            return None
+        obj = executor.load(deployment.model)
+        try:
+            obj.type.invoke('deploy', executor, obj, {})
+        finally:
+            deployment.result = engine.dsl.results_serializer.serialize(
+                obj, executor)
+        return deployment.result
@@ -1,12 +1,14 @@
 from muranocommon.messaging import Message
 from common import create_rmq_client
-from engine.dsl import classname, MuranoObject
+import replay
+from engine.dsl import classname, helpers, MuranoObject
 import eventlet.event
 import datetime
 import os
 import uuid
 import types
 from engine.dsl.yaql_expression import YaqlExpression
+from engine.dsl import profiler
 
 
 class AgentException(Exception):
@@ -23,12 +25,24 @@ class Agent(MuranoObject):
         self._queue = str('e%s-h%s' % (
             environment.object_id, host.object_id)).lower()
         self._environment = environment
+        self._tracer = helpers.get_executor(_context).tracer
 
     def queueName(self):
         return self._queue
 
     def _send(self, template, wait_results):
+        result = replay.call(self._tracer, 'agent:' + self._queue,
+                             'call' if wait_results else 'send',
+                             self._transmit, template, wait_results)
+        if not result:
+            return None
+
+        if result.get('FormatVersion', '1.0.0').startswith('1.'):
+            return self._process_v1_result(result)
+        else:
+            return self._process_v2_result(result)
 
+    def _transmit(self, template, wait_results):
         msg_id = template.get('ID', uuid.uuid4().hex)
         if wait_results:
             event = eventlet.event.Event()
@@ -45,17 +59,14 @@ class Agent(MuranoObject):
             client.send(message=msg, key=self._queue)
 
         if wait_results:
-            result = event.wait()
-
-            if not result:
-                return None
-
-            if result.get('FormatVersion', '1.0.0').startswith('1.'):
-                return self._process_v1_result(result)
-            else:
-                return self._process_v2_result(result)
-        else:
-            return None
+            try:
+                with profiler.blocked():
+                    return event.wait()
+            finally:
+                # nobody waits for the result any more if the calling
+                # method timed out
+                listener.unsubscribe(msg_id)
+        return None
 
     def call(self, template, resources):
         plan = self.buildExecutionPlan(template, resources)
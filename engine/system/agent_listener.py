@@ -1,6 +1,6 @@
-from engine.dsl import classname, MuranoObject
-import eventlet
+from engine.dsl import classname, helpers, MuranoObject
 from common import create_rmq_client
+import replay
 
 @classname('com.mirantis.murano.system.AgentListener')
 class AgentListener(MuranoObject):
@@ -8,13 +8,19 @@ class AgentListener(MuranoObject):
         self._results_queue = str('-execution-results-%s' % name.lower())
         self._subscriptions = {}
         self._receive_thread = None
+        executor = helpers.get_executor(_context)
+        self._task_group = executor.task_group
+        self._tracer = executor.tracer
 
     def queueName(self):
         return self._results_queue
 
     def start(self):
-        if self._receive_thread is None:
-            self._receive_thread = eventlet.spawn(self._receive)
+        if replay.is_replaying(self._tracer):
+            return
+        if self._receive_thread is None or self._receive_thread.dead:
+            self._receive_thread = self._task_group.spawn_unpooled(
+                self._receive)
 
     def stop(self):
         if self._receive_thread is not None:
@@ -24,6 +30,9 @@ class AgentListener(MuranoObject):
     def subscribe(self, message_id, event):
         self._subscriptions[message_id] = event
 
+    def unsubscribe(self, message_id):
+        self._subscriptions.pop(message_id, None)
+
     def _receive(self):
         with create_rmq_client() as client:
             client.declare(self._results_queue, enable_ha=True, ttl=86400000)
@@ -4,7 +4,8 @@ from heatclient.client import Client
 from keystoneclient.v2_0 import client as ksclient
 import heatclient.exc
 import engine.dsl.helpers
-import eventlet
+import engine.dsl.profiler
+from engine.system import replay
 
 @engine.dsl.classname('com.mirantis.murano.system.HeatStack')
 class HeatStack(engine.dsl.MuranoObject):
@@ -13,7 +14,13 @@ class HeatStack(engine.dsl.MuranoObject):
         self._template = None
         self._parameters = {}
         self._applied = True
-        environment = engine.dsl.helpers.get_environment(_context)
+        self._heat_client = None
+        self._tracer = engine.dsl.helpers.get_executor(_context).tracer
+        if not replay.is_replaying(self._tracer):
+            self._heat_client = self._create_heat_client(
+                engine.dsl.helpers.get_environment(_context))
+
+    def _create_heat_client(self, environment):
         keystone_settings = engine.config.CONF.keystone
         heat_settings = engine.config.CONF.heat
 
@@ -34,7 +41,7 @@ class HeatStack(engine.dsl.MuranoObject):
             service_type='orchestration',
             endpoint_type=heat_settings.endpoint_type)
 
-        self._heat_client = Client(
+        return Client(
             '1',
             heat_url,
             username='badusername',
@@ -46,18 +53,41 @@ class HeatStack(engine.dsl.MuranoObject):
             key_file=heat_settings.key_file or None,
             insecure=heat_settings.insecure)
 
+    def _heat_call(self, request, func):
+        return replay.call(self._tracer, 'heat:' + self._name, request, func)
+
+    def _heat_command(self, name, **kwargs):
+        def command():
+            getattr(self._heat_client.stacks, name)(**kwargs)
+        self._heat_call(name, command)
+
+    def _get_stack_info(self):
+        def get():
+            stack_info = self._heat_client.stacks.get(stack_id=self._name)
+            return {
+                'stack_name': stack_info.stack_name,
+                'id': stack_info.id,
+                'stack_status': stack_info.stack_status,
+                'parameters': stack_info.parameters,
+                'outputs': getattr(stack_info, 'outputs', None)
+            }
+        return self._heat_call('get', get)
+
     def current(self):
         if self._template is not None:
             return self._template
         try:
-            stack_info = self._heat_client.stacks.get(stack_id=self._name)
-            template = self._heat_client.stacks.template(
-                stack_id='{0}/{1}'.format(
-                    stack_info.stack_name,
-                    stack_info.id))
+            with engine.dsl.profiler.blocked():
+                stack_info = self._get_stack_info()
+                template = self._heat_call(
+                    'template',
+                    lambda: self._heat_client.stacks.template(
+                        stack_id='{0}/{1}'.format(
+                            stack_info['stack_name'],
+                            stack_info['id'])))
             # template = {}
             self._template = template
-            self._parameters.update(stack_info.parameters)
+            self._parameters.update(stack_info['parameters'])
             self._applied = True
             return self._template.copy()
         except heatclient.exc.HTTPNotFound:
@@ -98,14 +128,17 @@ class HeatStack(engine.dsl.MuranoObject):
         return status[0]
 
     def _wait_state(self, status_func):
+        with engine.dsl.profiler.blocked():
+            return self._wait_state_impl(status_func)
+
+    def _wait_state_impl(self, status_func):
         tries = 4
         delay = 1
         while tries > 0:
             while True:
                 try:
-                    stack_info = self._heat_client.stacks.get(
-                        stack_id=self._name)
-                    status = stack_info.stack_status
+                    stack_info = self._get_stack_info()
+                    status = stack_info['stack_status']
                     tries = 4
                     delay = 1
                 except heatclient.exc.HTTPNotFound:
@@ -116,11 +149,11 @@ class HeatStack(engine.dsl.MuranoObject):
                     delay *= 2
                     if not tries:
                         raise
-                    eventlet.sleep(delay)
+                    replay.sleep(self._tracer, delay)
                     break
 
                 if 'IN_PROGRESS' in status:
-                    eventlet.sleep(2)
+                    replay.sleep(self._tracer, 2)
                     continue
                 if not status_func(status):
                     raise EnvironmentError(
@@ -128,7 +161,7 @@ class HeatStack(engine.dsl.MuranoObject):
 
                 try:
                     return dict([(t['output_key'], t['output_value'])
-                                 for t in stack_info.outputs])
+                                 for t in stack_info['outputs']])
                 except Exception:
                     return {}
         return {}
@@ -146,19 +179,23 @@ class HeatStack(engine.dsl.MuranoObject):
 
         current_status = self._get_status()
         if current_status == 'NOT_FOUND':
-            self._heat_client.stacks.create(
-                stack_name=self._name,
-                parameters=self._parameters,
-                template=self._template,
-                disable_rollback=False)
+            with engine.dsl.profiler.blocked():
+                self._heat_command(
+                    'create',
+                    stack_name=self._name,
+                    parameters=self._parameters,
+                    template=self._template,
+                    disable_rollback=False)
 
             self._wait_state(
                 lambda status: status == 'CREATE_COMPLETE')
         else:
-            self._heat_client.stacks.update(
-                stack_id=self._name,
-                parameters=self._parameters,
-                template=self._template)
+            with engine.dsl.profiler.blocked():
+                self._heat_command(
+                    'update',
+                    stack_id=self._name,
+                    parameters=self._parameters,
+                    template=self._template)
             self._wait_state(
                 lambda status: status == 'UPDATE_COMPLETE')
 
@@ -167,7 +204,7 @@ class HeatStack(engine.dsl.MuranoObject):
     def delete(self):
         if not self.current():
             return
-        self._heat_client.stacks.delete(
-            stack_id=self._name)
+        with engine.dsl.profiler.blocked():
+            self._heat_command('delete', stack_id=self._name)
         self._wait_state(
             lambda status: status in ('DELETE_COMPLETE', 'NOT_FOUND'))
@@ -0,0 +1,88 @@
+import collections
+import json
+
+import eventlet
+
+from engine.openstack.common import importutils
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Recorder(object):
+    def __init__(self, model=None):
+        self._model = model
+        self._channels = collections.defaultdict(list)
+
+    def call(self, channel, request, func, *args, **kwargs):
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._channels[channel].append({
+                'request': request,
+                'error': '%s.%s' % (type(e).__module__, type(e).__name__),
+                'args': [unicode(t) for t in e.args]
+            })
+            raise
+        self._channels[channel].append({'request': request, 'result': result})
+        return result
+
+    def save(self, filename):
+        with open(filename, 'w') as file:
+            file.write(json.dumps(self.to_dictionary(), indent=True))
+
+    def to_dictionary(self):
+        return {
+            'Model': self._model,
+            'Channels': self._channels
+        }
+
+
+class Player(object):
+    # Responses are matched by channel and request, e.g. the stack and the
+    # Heat operation. Equal requests on one channel get the recorded
+    # responses in recorded order: when parallel branches poll the same
+    # stack, which branch gets which status depends on the scheduling, and
+    # so may the number of polls
+    def __init__(self, trace):
+        self._model = trace.get('Model')
+        self._channels = dict(
+            (channel, list(entries))
+            for channel, entries in trace.get('Channels', {}).iteritems())
+
+    @staticmethod
+    def load(filename):
+        with open(filename) as file:
+            return Player(json.loads(file.read()))
+
+    @property
+    def model(self):
+        return self._model
+
+    def call(self, channel, request, func, *args, **kwargs):
+        entries = self._channels.get(channel) or []
+        for index, entry in enumerate(entries):
+            if entry.get('request') == request:
+                break
+        else:
+            raise ReplayError('No recorded response left for {0} {1}'.format(
+                channel, request))
+        del entries[index]
+        if 'error' in entry:
+            raise importutils.import_class(entry['error'])(*entry['args'])
+        return entry['result']
+
+
+def is_replaying(tracer):
+    return isinstance(tracer, Player)
+
+
+def call(tracer, channel, request, func, *args, **kwargs):
+    if tracer is None:
+        return func(*args, **kwargs)
+    return tracer.call(channel, request, func, *args, **kwargs)
+
+
+def sleep(tracer, seconds):
+    eventlet.sleep(0 if is_replaying(tracer) else seconds)
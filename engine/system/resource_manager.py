@@ -2,7 +2,8 @@ import os.path
 import json as jsonlib
 import yaml as yamllib
 
-from engine.dsl import MuranoObject
+from engine.dsl import helpers, MuranoObject
+import replay
 
 
 class ResourceManager(MuranoObject):
@@ -10,9 +11,16 @@ class ResourceManager(MuranoObject):
         if _class is None:
             _class = _context.get_data('$')
         class_name = _class.type.name
+        self._class_name = class_name
         self._base_path = os.path.join(base_path, class_name, 'resources')
+        self._tracer = helpers.get_executor(_context).tracer
 
     def string(self, name):
+        return replay.call(self._tracer,
+                           'resources:%s/%s' % (self._class_name, name),
+                           'read', self._read, name)
+
+    def _read(self, name):
         path = os.path.join(self._base_path, name)
         with open(path) as file:
             return file.read()
@@ -2,7 +2,7 @@ import base64
 import re
 import types
 
-from yaql.context import EvalArg
+from yaql.context import ContextAware, EvalArg
 
 import engine.config as cfg
 from engine.dsl import helpers
@@ -168,8 +168,9 @@ def _int(value):
     return int(value)
 
 
-def _pselect(collection, composer):
-    return helpers.parallel_select(collection(), composer)
+@ContextAware()
+def _pselect(context, collection, composer):
+    return helpers.parallel_select(collection(), composer, context)
 
 
 def register(context):
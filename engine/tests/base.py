@@ -0,0 +1,59 @@
+import os.path
+import re
+import types
+
+from engine import class_loader
+from engine.dsl.executor import MuranoDslExecutor
+from engine.dsl.murano_object import MuranoObject
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'meta')
+META_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'meta')
+
+
+class TestClassLoader(class_loader.ClassLoader):
+    # classes of the tests, com.mirantis.murano.* comes from meta/
+    def __init__(self):
+        super(TestClassLoader, self).__init__(FIXTURES_PATH)
+
+    def load_definition(self, name):
+        definition = super(TestClassLoader, self).load_definition(name)
+        if definition is None:
+            self._base_path, path = META_PATH, self._base_path
+            try:
+                definition = super(TestClassLoader, self).load_definition(
+                    name)
+            finally:
+                self._base_path = path
+        return definition
+
+
+def create_executor(compile_expressions=True, **kwargs):
+    return MuranoDslExecutor(TestClassLoader(),
+                             compile_expressions=compile_expressions,
+                             **kwargs)
+
+
+def load_leaf(executor):
+    return executor.load({'Objects': {
+        '?': {'id': 'leaf', 'type': 'test.Leaf'},
+        'items': [
+            {'?': {'id': 'item%d' % i, 'type': 'test.Item'},
+             'value': i, 'tags': ['x']}
+            for i in range(3)]}})
+
+
+def normalize(value):
+    # comparable form of validation and evaluation results: objects by id,
+    # generated ids and lazy sequences resolved
+    if isinstance(value, types.StringTypes):
+        return re.sub('[0-9a-f]{32,}', '<id>', value)
+    if isinstance(value, (types.ListType, types.TupleType,
+                          types.GeneratorType)) or \
+            type(value).__name__ in ('imap', 'ifilter', 'islice'):
+        return [normalize(t) for t in value]
+    if isinstance(value, types.DictionaryType):
+        return dict((normalize(k), normalize(v))
+                    for k, v in value.iteritems())
+    if isinstance(value, MuranoObject):
+        return 'object', normalize(value.object_id), value.type.name
+    return value
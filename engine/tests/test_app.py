@@ -0,0 +1,52 @@
+import unittest
+
+import eventlet
+
+from engine import app
+from engine import scheduler
+from engine.tests import base
+
+
+class Message(object):
+    def __init__(self, message_id, body, events):
+        self.id = message_id
+        self.body = body
+        self._events = events
+
+    def ack(self):
+        self._events.append(('ack', self.id))
+
+
+class TestEngineService(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.service = app.EngineService()
+        self.service._scheduler = scheduler.DeploymentScheduler(
+            base.TestClassLoader(), max_concurrency=1)
+        self.service._publish_result = lambda message_id, result: \
+            self.events.append(('result', message_id, result))
+
+    def receive(self, message_id, model):
+        self.service._task_slots.acquire()
+        self.service._in_flight += 1
+        with eventlet.Timeout(5):
+            self.service._task_received(Message(
+                message_id, {'tenant_id': 'tenant', 'model': model},
+                self.events))
+
+    def test_result(self):
+        self.receive('a', {'Objects': {
+            '?': {'id': 'leaf', 'type': 'test.Leaf'},
+            'data': {'delay': 0}}})
+        self.assertEqual(['result', 'ack'], [t[0] for t in self.events])
+        self.assertEqual('leaf', self.events[0][2]['Objects']['?']['id'])
+
+    def test_result_of_failed_load(self):
+        # the model is not loaded, the task must still be finished
+        model = {'Objects': {'?': {'id': 'leaf', 'type': 'test.Missing'}}}
+        self.receive('a', model)
+        self.assertEqual(['result', 'ack'], [t[0] for t in self.events])
+        result = self.events[0][2]
+        self.assertEqual(model['Objects'], result['Objects'])
+        self.assertEqual(scheduler.Deployment.Failed, result['State'])
+        self.assertIsNotNone(result['Error'])
@@ -0,0 +1,70 @@
+import unittest
+
+import eventlet
+import greenlet
+
+from engine.dsl import lock_manager
+from engine.dsl.yaql_expression import YaqlExpression
+from engine.tests import base
+
+
+class TestMethodLockManager(unittest.TestCase):
+    def setUp(self):
+        self.locks = lock_manager.MethodLockManager()
+        self.errors = []
+
+    def hold(self, owner):
+        try:
+            self.locks.acquire('key', owner, 'hold')
+            try:
+                eventlet.sleep(10)
+            finally:
+                self.locks.release('key', owner)
+        except greenlet.GreenletExit:
+            pass
+        except Exception as e:
+            self.errors.append(e)
+
+    def test_contention(self):
+        threads = [eventlet.spawn(self.hold, i) for i in range(3)]
+        eventlet.sleep(0)
+        self.assertEqual(2, self.locks.statistics()['hold']['queueLength'])
+        for thread in threads:
+            thread.kill()
+        self.assertEqual([], self.errors)
+        self.assertFalse(self.locks.is_locked('key'))
+
+    def test_release_all_while_held_and_waited(self):
+        # the owner and the waiter unwind after their locks were dropped
+        threads = [eventlet.spawn(self.hold, i) for i in range(2)]
+        eventlet.sleep(0)
+        self.locks.release_all()
+        for thread in threads:
+            thread.kill()
+        self.assertEqual([], self.errors)
+        self.assertFalse(self.locks.is_locked('key'))
+
+
+class TestCancel(unittest.TestCase):
+    def test_cancel_while_held_and_waited(self):
+        executor = base.create_executor()
+        leaf = base.load_leaf(executor)
+        frame = executor._create_context(leaf, leaf.type, None)
+        results = []
+
+        def hold():
+            try:
+                YaqlExpression('$.hold()').evaluate(frame)
+            except BaseException as e:
+                results.append(type(e))
+                raise
+
+        threads = [executor.task_group.spawn_unpooled(hold)
+                   for _ in range(2)]
+        eventlet.sleep(0)
+        self.assertEqual(
+            1, executor.lock_manager.statistics()['test.Leaf.hold'][
+                'queueLength'])
+        executor.cancel()
+        self.assertTrue(all(t.dead for t in threads))
+        self.assertEqual([greenlet.GreenletExit] * 2, results)
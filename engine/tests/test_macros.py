@@ -0,0 +1,26 @@
+import unittest
+
+from engine.dsl import macros
+from engine.dsl.yaql_expression import YaqlExpression
+from engine.tests import base
+
+
+class TestForMacro(unittest.TestCase):
+    def setUp(self):
+        self.executor = base.create_executor()
+        self.leaf = base.load_leaf(self.executor)
+
+    def invoke(self, name):
+        return self.leaf.type.invoke(name, self.executor, self.leaf, {})
+
+    def test_into(self):
+        self.assertEqual([1, 2, 3], self.invoke('collect'))
+
+    def test_parallel_into(self):
+        self.assertEqual([1, 2, 3], self.invoke('pcollect'))
+
+    def test_without_into(self):
+        block = macros.ForMacro('i', [1, 2], [YaqlExpression('$i')])
+        frame = self.executor._create_context(
+            self.leaf, self.leaf.type, None)
+        self.assertIsNone(block.execute(frame, self.leaf.type))
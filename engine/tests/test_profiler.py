@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import eventlet
+
+from engine.dsl import profiler
+from engine.tests import base
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profilers = []
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for t in self.profilers:
+            t.stop()
+        shutil.rmtree(self.directory)
+
+    def run_deployments(self, *methods):
+        threads = []
+        for method in methods:
+            deployment_profiler = profiler.Profiler()
+            deployment_profiler.start()
+            self.profilers.append(deployment_profiler)
+            executor = base.create_executor(profiler=deployment_profiler)
+            leaf = base.load_leaf(executor)
+            threads.append(executor.task_group.spawn_unpooled(
+                leaf.type.invoke, method, executor, leaf, {}))
+        for thread in threads:
+            thread.wait()
+
+    def collapsed_stacks(self, deployment_profiler):
+        filename = os.path.join(self.directory, 'profile.folded')
+        deployment_profiler.write_collapsed_stacks(filename)
+        with open(filename) as file:
+            return [t.rsplit(' ', 1)[0] for t in file.read().splitlines()]
+
+    def test_concurrent_deployments(self):
+        self.run_deployments('pcollect', 'collect')
+        first, second = [t.report() for t in self.profilers]
+        self.assertIn('test.Leaf.pcollect', first)
+        self.assertNotIn('test.Leaf.collect', first)
+        self.assertIn('test.Leaf.collect', second)
+        self.assertNotIn('test.Leaf.pcollect', second)
+        self.assertEqual(3, first['test.Base.inc']['calls'])
+        self.assertEqual(3, second['test.Base.inc']['calls'])
+
+    def test_parallel_stacks(self):
+        # iterations of a parallel For are charged to the method running
+        # the loop
+        self.run_deployments('pcollect')
+        stacks = [t for t in self.collapsed_stacks(self.profilers[0])
+                  if t.endswith(';test.Base.inc')]
+        self.assertTrue(stacks)
+        for stack in stacks:
+            self.assertTrue(stack.startswith('test.Leaf.pcollect;For;'),
+                            stack)
+
+    def test_stopped(self):
+        deployment_profiler = profiler.Profiler()
+        executor = base.create_executor(profiler=deployment_profiler)
+        leaf = base.load_leaf(executor)
+        leaf.type.invoke('collect', executor, leaf, {})
+        self.assertEqual({}, deployment_profiler.report())
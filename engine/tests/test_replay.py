@@ -0,0 +1,154 @@
+import json
+import unittest
+
+import eventlet
+import heatclient.exc
+
+import engine.system
+from engine.dsl.yaql_expression import YaqlExpression
+from engine.system import heat_stack
+from engine.system import replay
+from engine.tests import base
+
+
+def _round_trip(recorder):
+    # what Recorder.save writes and Player.load reads
+    return replay.Player(json.loads(json.dumps(recorder.to_dictionary())))
+
+
+def _not_called(*args, **kwargs):
+    raise AssertionError('live channel called while replaying')
+
+
+class FakeAgent(object):
+    def __init__(self):
+        self.calls = []
+
+    def transmit(self, template, wait_results):
+        self.calls.append(template['Name'])
+        eventlet.sleep(0)
+        if template['Name'] == 'broken':
+            raise ValueError('agent failure')
+        return {'Result': template['Name'].upper()} if wait_results else None
+
+
+class TestChannels(unittest.TestCase):
+    def deploy(self, tracer, transmit, host):
+        results = []
+        for name in ('install', 'configure'):
+            results.append(replay.call(
+                tracer, 'agent:' + host, 'call', transmit,
+                {'Name': name}, True))
+        results.append(replay.call(
+            tracer, 'agent:' + host, 'send', transmit,
+            {'Name': 'notify'}, False))
+        return results
+
+    def run_parallel(self, tracer, transmit):
+        threads = [eventlet.spawn(self.deploy, tracer, transmit, host)
+                   for host in ('host1', 'host2')]
+        return [thread.wait() for thread in threads]
+
+    def test_record_and_replay(self):
+        agent = FakeAgent()
+        recorder = replay.Recorder({'Objects': None})
+        expected = self.run_parallel(recorder, agent.transmit)
+        self.assertEqual(6, len(agent.calls))
+
+        player = _round_trip(recorder)
+        self.assertEqual({'Objects': None}, player.model)
+        self.assertEqual(expected, self.run_parallel(player, _not_called))
+
+    def test_replay_matches_requests(self):
+        # responses follow the request, not the order of the calls
+        recorder = replay.Recorder()
+        replay.call(recorder, 'agent:host', 'call', lambda: 'called')
+        replay.call(recorder, 'agent:host', 'send', lambda: 'sent')
+
+        player = _round_trip(recorder)
+        self.assertEqual('sent', replay.call(
+            player, 'agent:host', 'send', _not_called))
+        self.assertEqual('called', replay.call(
+            player, 'agent:host', 'call', _not_called))
+
+    def test_replay_errors(self):
+        agent = FakeAgent()
+        recorder = replay.Recorder()
+        self.assertRaises(ValueError, replay.call, recorder, 'agent:host',
+                          'call', agent.transmit, {'Name': 'broken'}, True)
+
+        player = _round_trip(recorder)
+        try:
+            replay.call(player, 'agent:host', 'call', _not_called)
+            self.fail('recorded error was not raised')
+        except ValueError as e:
+            self.assertEqual(('agent failure',), e.args)
+        self.assertRaises(replay.ReplayError, replay.call, player,
+                          'agent:host', 'call', _not_called)
+
+
+class FakeStack(object):
+    def __init__(self, stack_status):
+        self.id = 'stack-id'
+        self.stack_name = 'teststack'
+        self.stack_status = stack_status
+        self.parameters = {'flavor': 'm1.small'}
+        self.outputs = [{'output_key': 'ip', 'output_value': '10.0.0.1'}]
+
+
+class FakeStacks(object):
+    def __init__(self):
+        self.commands = []
+
+    def get(self, stack_id):
+        if not self.commands:
+            raise heatclient.exc.HTTPNotFound()
+        return FakeStack('CREATE_COMPLETE')
+
+    def template(self, stack_id):
+        return {'Resources': {}}
+
+    def create(self, **kwargs):
+        self.commands.append('create')
+
+
+class FakeHeatClient(object):
+    def __init__(self):
+        self.stacks = FakeStacks()
+
+
+class TestHeatStack(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeHeatClient()
+        self._create_heat_client = heat_stack.HeatStack._create_heat_client
+        heat_stack.HeatStack._create_heat_client = \
+            lambda stack, environment: self.client
+
+    def tearDown(self):
+        heat_stack.HeatStack._create_heat_client = self._create_heat_client
+
+    def deploy(self, tracer):
+        executor = base.create_executor(tracer=tracer)
+        engine.system.register(executor._class_loader, base.FIXTURES_PATH)
+        leaf = base.load_leaf(executor)
+        frame = executor._create_context(leaf, leaf.type, None)
+        stack = YaqlExpression(
+            "new('com.mirantis.murano.system.HeatStack', "
+            "name => 'teststack')").evaluate(frame)
+        results = [stack.current()]
+        stack.setTemplate({'Resources': {'server': {}}})
+        stack.push()
+        results.append(stack._wait_state(lambda status: True))
+        stack.setTemplate(None)
+        results.append(stack.parameters())
+        return results
+
+    def test_record_and_replay(self):
+        recorder = replay.Recorder()
+        expected = self.deploy(recorder)
+        self.assertEqual(
+            [{}, {'ip': '10.0.0.1'}, {'flavor': 'm1.small'}], expected)
+        self.assertEqual(['create'], self.client.stacks.commands)
+
+        self.client = None
+        self.assertEqual(expected, self.deploy(_round_trip(recorder)))
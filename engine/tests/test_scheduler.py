@@ -0,0 +1,59 @@
+import unittest
+
+import eventlet
+
+from engine import scheduler
+from engine.tests import base
+
+
+def create_deployment(deployment_id, delay):
+    return scheduler.Deployment(deployment_id, 'tenant', 'token', {
+        'Objects': {
+            '?': {'id': 'leaf', 'type': 'test.Leaf'},
+            'data': {'delay': delay}
+        }
+    })
+
+
+class TestDeploymentScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = scheduler.DeploymentScheduler(
+            base.TestClassLoader(), max_concurrency=2)
+
+    def test_deploy(self):
+        deployment = self.scheduler.submit(create_deployment('a', 0))
+        with eventlet.Timeout(5):
+            result = deployment.wait()
+        self.assertEqual(scheduler.Deployment.Completed, deployment.state)
+        self.assertEqual('leaf', result['Objects']['?']['id'])
+
+    def test_duplicate_ids(self):
+        # a redelivered message runs next to its first delivery
+        first = self.scheduler.submit(create_deployment('a', 0))
+        second = self.scheduler.submit(create_deployment('a', 0.05))
+        self.assertEqual(2, self.scheduler.running_count)
+        with eventlet.Timeout(5):
+            first.wait()
+            second.wait()
+        self.assertEqual(0, self.scheduler.running_count)
+        self.assertEqual(
+            [scheduler.Deployment.Completed] * 2,
+            [t['state'] for t in self.scheduler.statistics()['deployments']])
+
+    def test_cancel_duplicate_ids(self):
+        deployments = [self.scheduler.submit(create_deployment('a', 10))
+                       for _ in range(3)]
+        eventlet.sleep(0)
+        self.assertTrue(self.scheduler.cancel('a'))
+        with eventlet.Timeout(5):
+            for deployment in deployments[:2]:
+                deployment.wait()
+        self.assertEqual(
+            [scheduler.Deployment.Cancelled] * 2,
+            [t.state for t in deployments[:2]])
+        self.assertEqual(1, self.scheduler.running_count)
+        self.assertTrue(self.scheduler.cancel('a'))
+        with eventlet.Timeout(5):
+            deployments[2].wait()
+        self.assertEqual(0, self.scheduler.running_count)
+        self.assertFalse(self.scheduler.cancel('a'))
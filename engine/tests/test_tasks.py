@@ -0,0 +1,34 @@
+import unittest
+
+import eventlet
+import greenlet
+
+from engine.dsl import tasks
+
+
+class TestTaskGroup(unittest.TestCase):
+    def setUp(self):
+        self.group = tasks.TaskPool(size=4, quota=2).create_group()
+        self.calls = []
+
+    def test_map(self):
+        self.assertEqual([1, 4, 9], self.group.map(lambda t: t * t,
+                                                   [1, 2, 3], limit=1))
+
+    def test_cancel(self):
+        thread = self.group.spawn(eventlet.sleep, 10)
+        eventlet.sleep(0)
+        self.group.cancel()
+        self.assertTrue(thread.dead)
+        self.assertEqual(0, self.group.statistics()['threads'])
+
+    def test_spawn_after_cancel(self):
+        self.group.cancel()
+        self.assertRaises(greenlet.GreenletExit, self.group.spawn,
+                          self.calls.append, 1)
+        self.assertRaises(greenlet.GreenletExit, self.group.spawn_unpooled,
+                          self.calls.append, 2)
+        self.assertRaises(greenlet.GreenletExit, self.group.map,
+                          self.calls.append, [3])
+        eventlet.sleep(0)
+        self.assertEqual([], self.calls)
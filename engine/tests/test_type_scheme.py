@@ -0,0 +1,143 @@
+import gc
+import unittest
+import weakref
+
+from engine.dsl import type_scheme
+from engine.dsl.yaql_expression import YaqlExpression
+from engine.tests import base
+
+Y = YaqlExpression
+
+# every shape compile_native_contract recognizes
+CONTRACTS = [
+    Y('$'), Y('$.int()'), Y('$.int().notNull()'), Y('$.string()'),
+    Y('$.string().notNull()'), Y('$.bool()'), Y('$.bool().notNull()'),
+    Y('$.class(Item)'), Y('$.class(Item).notNull()'), Y('$.class(Leaf)'),
+    Y('$.class(Weird)'), Y('$.class(std:Object)'),
+    Y('$.class(Missing)'), Y('$.notNull()'), Y('$.notNull().notNull()'),
+    [Y('$')], [Y('$.int()')], [Y('$.string().notNull()')], [Y('$.bool()')],
+    [Y('$.int()'), 1], [Y('$.int().notNull()'), 1, 2],
+    [Y('$.class(Item).notNull()')], [Y('$.class(Item)'), 0, 1],
+]
+
+
+class Reference(object):
+    # an object of the deployment under test
+    def __init__(self, object_id):
+        self.object_id = object_id
+
+
+ITEM = {'?': {'id': 'item9', 'type': 'test.Item'}, 'value': 9}
+
+DATA = [
+    # null and wrong type
+    None, type_scheme.NoValue, 2.5, object, {}, {'a': 1}, [],
+    # bool vs int and strings for int
+    True, False, 0, 1, -3, '0', '7', u'8', ' 9', 'x', u'y', 'true', '',
+    # class() with dicts and ids
+    Reference('leaf'), Reference('item0'), Reference('weird'), 'item1',
+    u'item2', 'leaf', 'weird', 'missing', ITEM, {'?': {'id': 'item0'}},
+    {'?': {'id': 'new', 'type': 'test.Missing'}},
+    # nested lists
+    [1, 2], [1, '2'], [None], [True], [[1]], [[1], [2]], [Reference('item0')],
+    ['item0', Reference('item1')], [Reference('item0'), None], [ITEM],
+    [Reference('weird'), 'missing'], [1, 2, 3]
+]
+
+DEFAULTS = [None, 5, 'd', True, {}, [1]]
+
+
+class InterpretedTypeScheme(type_scheme.TypeScheme):
+    # the generic scheme with every expression evaluated by yaql
+    def _get_native_leaves(self, namespace_resolver):
+        return {}
+
+
+class Deployment(object):
+    def __init__(self):
+        self.executor = base.create_executor()
+        self.leaf = base.load_leaf(self.executor)
+        self.executor.object_store.load(
+            {'?': {'id': 'weird', 'type': 'test.Weird'}, 'value': 1},
+            None, self.executor._root_context)
+
+    def validate(self, validate, data, default, this_id):
+        if isinstance(data, Reference):
+            data = self.executor.object_store.get(data.object_id)
+        elif isinstance(data, list):
+            data = [self.executor.object_store.get(t.object_id)
+                    if isinstance(t, Reference) else t for t in data]
+        try:
+            return 'value', base.normalize(validate(
+                data, self.executor._root_context,
+                self.executor.object_store.get(this_id),
+                self.executor.object_store,
+                self.leaf.type.namespace_resolver, default))
+        except Exception as e:
+            return 'error', type(e).__name__
+
+
+class TestNativeContracts(unittest.TestCase):
+    def setUp(self):
+        self.native = Deployment()
+        self.interpreted = Deployment()
+
+    def test_native_contracts(self):
+        mismatches = []
+        resolver = self.native.leaf.type.namespace_resolver
+        for contract in CONTRACTS:
+            validate = type_scheme.compile_native_contract(
+                contract, resolver)
+            if validate is None:
+                mismatches.append((contract, 'not compiled'))
+                continue
+            scheme = InterpretedTypeScheme(contract)
+            for data in DATA:
+                for default in DEFAULTS:
+                    for this_id in ('leaf', 'weird'):
+                        native = self.native.validate(
+                            validate, data, default, this_id)
+                        interpreted = self.interpreted.validate(
+                            scheme, data, default, this_id)
+                        if native != interpreted:
+                            mismatches.append((contract, data, default,
+                                               this_id, native, interpreted))
+        self.assertEqual([], mismatches)
+
+    def test_unknown_shapes(self):
+        resolver = self.native.leaf.type.namespace_resolver
+        for contract in (Y('$.int().check($ > 0)'), Y('$.class(nope:X)'),
+                         Y('$.class(Item).owned()'), {}, [],
+                         [Y('$.int()'), Y('$.string()')], 'x', None):
+            self.assertIsNone(type_scheme.compile_native_contract(
+                contract, resolver))
+
+
+class TestLazyResults(unittest.TestCase):
+    def test_lazy_results(self):
+        # values on the same level share a context, a generator must
+        # still see its own $ when it is consumed later
+        deployment = Deployment()
+        scheme = type_scheme.TypeScheme({
+            'a': [Y('select($, $ * 2)')],
+            'b': {Y('$.string()'): Y('select($, $ + 1)')}})
+        result = deployment.validate(
+            scheme, {'a': [[1, 2], [3, 4]], 'b': {'x': [1], 'y': [2]}},
+            None, 'leaf')
+        self.assertEqual(('value', {'a': [[2, 4], [6, 8]],
+                                    'b': {'x': [2], 'y': [3]}}), result)
+
+
+class TestCollection(unittest.TestCase):
+    def test_executor_collected(self):
+        # nothing that contracts cache may outlive the deployment
+        executor = base.create_executor()
+        leaf = base.load_leaf(executor)
+        type_scheme.TypeScheme([Y('$.int().check($ >= 0)')])(
+            [1], executor._root_context, leaf, executor.object_store,
+            leaf.type.namespace_resolver, None)
+        leaf.type.invoke('inc', executor, leaf, {'by': 2})
+        references = [weakref.ref(executor), weakref.ref(leaf)]
+        del executor, leaf
+        gc.collect()
+        self.assertEqual([None, None], [t() for t in references])
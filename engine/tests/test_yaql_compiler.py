@@ -0,0 +1,189 @@
+import glob
+import os.path
+import unittest
+
+import eventlet
+import greenlet
+import yaml
+from yaql.context import Context
+
+from engine.dsl import exceptions
+from engine.dsl import time_slicer
+from engine.dsl import yaql_compiler
+from engine.dsl.yaql_expression import YaqlExpression
+from engine.tests import base
+
+EXPRESSIONS = [
+    # fast paths
+    '$.counter', '$.name', '$n', '$n + 1', '$n * 2 - 1', '$n / 2', '$n > 2',
+    '$n = 3', '$n != 3', '$s + $s', '2 in $lst', '$lst', '($n)', '$x',
+    '$x + $n', '$n < 2 and $n > 0', '$n > 2 or false', 'not ($n > 2)',
+    'not 1', '1 and true', 'true and 1', 'null or true',
+    # attribution and its fallbacks
+    '$d.a.b', '$d.missing', '$.missing', '$.items[0].value',
+    '$.items.value', '$.items[0].nosuch', '$.items[$.value > 1].value',
+    '$lst.missing', '$n.real', '$.data.key',
+    # functions and methods
+    'len($lst)', '$lst.sum()', "'abc'.len()", 'list(1, 2)',
+    'dict(a => 1, b => 2)', 'a => 1', 'range(0, 3).select($ * $)',
+    'coalesce(null, 2)', 'switch($n, $ > 5 => big, $ > 1 => small)',
+    '$n.as($ + 1 => y)', '$lst.as($.sum() => y).select($ + $y)',
+    '$lst.select($.as($ * 2 => z)).select($z)', '$lst[1]', '$lst[$ > 1]',
+    '$.items.where($.value > 1).select($.value * 2)',
+    '$.items.take_while($.value < 2).select($.value)', '$.items.len()',
+    '$.who()', '$this.cast(Base).who()', '$.super($.who())', '$.id()',
+    '$.items[0].id()', '$.items[0].get()', '$.items[0].ping($.items[1], 1)',
+    '$.inc(2)', '$.counter', '$.items.select($.inc())', 'str($n)',
+    # failures of _try_invoke: no overload, invalid arguments, arguments
+    # that cannot be evaluated and errors of the function itself
+    '$.nope()', '($.nope())', '$n + $.nope()', '$.nope() and true',
+    'not $.nope()', '$.items.select($.nope())', 'toLower(1)',
+    'toLower($.nope())', '$lst.join(x)', 'int($s)', '$.inc(x)',
+    '$.items[0].ping(1, 1)', 'nosuch()', 'nosuch(1, 2)', '$n.len()'
+]
+
+VARIABLES = {
+    'n': 3,
+    's': 'str',
+    'lst': [1, 2, 3],
+    'd': {'a': {'b': 1}},
+    't': 1,
+    'template': {'a': 1},
+    'resources': None,
+}
+
+
+def meta_expressions():
+    # every expression of the shipped classes, whatever they refer to
+    # is mostly missing in the context of test.Leaf
+    expressions = set()
+
+    def walk(node):
+        if isinstance(node, YaqlExpression):
+            expressions.add(str(node))
+        elif isinstance(node, dict):
+            for key, value in node.iteritems():
+                walk(key)
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    for path in glob.glob(os.path.join(base.META_PATH, '*', 'manifest.yaml')):
+        with open(path) as stream:
+            walk(yaml.load(stream))
+    return sorted(expressions)
+
+
+def evaluate(expression, context):
+    try:
+        return 'value', base.normalize(
+            YaqlExpression(expression).evaluate(context))
+    except Exception as e:
+        return 'error', type(e).__name__, base.normalize(str(e))
+
+
+class Deployment(object):
+    def __init__(self, compile_expressions):
+        self.executor = base.create_executor(compile_expressions)
+        self.leaf = base.load_leaf(self.executor)
+        self.frame = self.executor._create_context(
+            self.leaf, self.leaf.type, None, **VARIABLES)
+        self.child = Context(self.frame)
+        self.child.set_data(7, 'x')
+
+    def state(self):
+        return [self.leaf.get_property('counter', self.leaf.type)] + [
+            t.get_property('counter', t.type)
+            for t in self.leaf.get_property('items', self.leaf.type)]
+
+
+class TestCompiledExpressions(unittest.TestCase):
+    def setUp(self):
+        self.compiled = Deployment(True)
+        self.interpreted = Deployment(False)
+
+    def test_function_tables(self):
+        table = yaql_compiler.find_function_table(self.compiled.frame)
+        self.assertTrue(table.compiled)
+        self.assertIsNone(
+            yaql_compiler.find_function_table(self.interpreted.frame))
+
+    def test_expressions(self):
+        self._compare(EXPRESSIONS)
+
+    def test_meta_expressions(self):
+        self._compare(meta_expressions())
+
+    def _compare(self, expressions):
+        mismatches = []
+        for name in ('frame', 'child'):
+            for expression in expressions:
+                interpreted = evaluate(
+                    expression, getattr(self.interpreted, name))
+                compiled = evaluate(expression, getattr(self.compiled, name))
+                if interpreted != compiled or \
+                        self.interpreted.state() != self.compiled.state():
+                    mismatches.append((name, expression, interpreted,
+                                       compiled, self.interpreted.state(),
+                                       self.compiled.state()))
+        self.assertEqual([], mismatches)
+
+
+class TestTimeouts(unittest.TestCase):
+    # eventlet.Timeout is not an Exception and must cross compiled
+    # expressions unchanged
+    def setUp(self):
+        self.deployment = Deployment(True)
+
+    def test_operands(self):
+        for expression in ('sleep(1) and true', 'false or sleep(1)',
+                           'not sleep(1)', 'sleep(1) + 1', '(sleep(1))',
+                           'toLower(sleep(1))'):
+            with eventlet.Timeout(0.01):
+                self.assertRaises(eventlet.Timeout, evaluate, expression,
+                                  self.deployment.frame)
+
+    def test_method_timeout(self):
+        self.assertRaises(exceptions.MethodTimeout,
+                          YaqlExpression('$.wait()').evaluate,
+                          self.deployment.frame)
+
+    def test_argument_timeout(self):
+        # yaql reports a timeout while it evaluates a function argument as
+        # a failure of the function
+        with eventlet.Timeout(0.5):
+            self.assertRaises(exceptions.MethodTimeout,
+                              YaqlExpression('$.waitSlow()').evaluate,
+                              self.deployment.frame)
+        self.assertEqual([1, 0, 0, 0], self.deployment.state())
+
+    def test_expired_timer(self):
+        # nothing is called any more once the timer of a method expired,
+        # not even by the next overload yaql tries
+        timer = time_slicer.start_method_timer(0.01)
+        try:
+            self.assertRaises(eventlet.Timeout, eventlet.sleep, 1)
+            self.assertRaises(eventlet.Timeout, evaluate, '$.inc()',
+                              self.deployment.frame)
+            self.assertRaises(eventlet.Timeout, evaluate, 'sleep(1)',
+                              self.deployment.frame)
+        finally:
+            time_slicer.stop_method_timer(timer)
+        self.assertEqual([0, 0, 0, 0], self.deployment.state())
+
+    def test_cancelled(self):
+        self.deployment.executor.cancel()
+        self.assertRaises(greenlet.GreenletExit, evaluate, '$.inc()',
+                          self.deployment.frame)
+        self.assertEqual([0, 0, 0, 0], self.deployment.state())
+
+
+class TestInterpretedTimeouts(TestTimeouts):
+    def setUp(self):
+        self.deployment = Deployment(False)
+
+    def test_operands(self):
+        # yaql itself reports timeouts of operands as failures of the
+        # operators, only the timeouts of methods are kept
+        pass
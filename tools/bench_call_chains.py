@@ -0,0 +1,88 @@
+"""Measures deep chains of nested DSL method calls.
+
+Runs a method that calls itself until a given depth is reached, for
+chains of 1 to 100 calls, with the method bodies run inline and on
+spawned green threads, and reports the time per call. Every call of the
+chain builds a method frame, validates its argument and evaluates the
+yaql expression that makes the next call. Every call also takes a few
+dozen Python frames, so the recursion limit is raised for the longest
+chains. Run from the root of the repository:
+
+    python tools/bench_call_chains.py [-n CHAINS]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl.executor import MuranoDslExecutor
+from engine.tests import base
+
+DEPTHS = (1, 10, 50, 100)
+RECURSION_LIMIT = 10000
+
+CHAIN = """
+Namespaces:
+    =: test
+Name: Chain
+
+Workflow:
+  nested:
+    Arguments:
+      - depth:
+          Contract: $.int().notNull()
+    Body:
+      - If: $depth > 1
+        Then:
+          - Return: $.nested($depth - 1) + 1
+        Else:
+          - Return: 1
+"""
+
+
+class ChainClassLoader(base.TestClassLoader):
+    def load_definition(self, name):
+        if name == 'test.Chain':
+            return yaml.load(CHAIN)
+        return super(ChainClassLoader, self).load_definition(name)
+
+
+def measure(executor, chain, depth, chains):
+    started = time.time()
+    for _ in xrange(chains):
+        assert executor.invoke_method('nested', chain, None, None,
+                                      depth) == depth
+    return (time.time() - started) / chains / depth * 1e6
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--chains', type='int', default=200,
+                      help='chains of every depth')
+    options, _ = parser.parse_args()
+    sys.setrecursionlimit(RECURSION_LIMIT)
+
+    executors = []
+    for inline_calls in (True, False):
+        executor = MuranoDslExecutor(ChainClassLoader(),
+                                     inline_calls=inline_calls)
+        chain = executor.load({'Objects': {
+            '?': {'id': 'chain', 'type': 'test.Chain'}}})
+        executors.append((executor, chain))
+
+    print('%-8s %14s %14s' % ('depth', 'inline/call', 'spawned/call'))
+    for depth in DEPTHS:
+        timings = [measure(executor, chain, depth, options.chains)
+                   for executor, chain in executors]
+        print('%-8d %12.1fus %12.1fus' % tuple([depth] + timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Measures the dispatch of Match blocks with large tables.
+
+Executes Match blocks of 10 to 10000 literal keys with a value that
+selects a branch and with one that falls through to Default. Switch
+blocks of the same sizes, which evaluate every condition, are measured
+for comparison. Run from the root of the repository:
+
+    python tools/bench_match.py [-n EXECUTIONS]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+from yaql.context import Context
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl import macros
+from engine.dsl.yaql_expression import YaqlExpression as Y
+from engine.tests import base
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def create_match(size):
+    return macros.MatchMacro(
+        dict(('k%d' % i, [{Y('$result'): i}]) for i in range(size)),
+        Y('$value'), Default=[{Y('$result'): -1}])
+
+
+def create_switch(size):
+    return macros.SwitchMacro(
+        dict((Y('$value = k%d' % i), [{Y('$result'): i}])
+             for i in range(size)),
+        Default=[{Y('$result'): -1}])
+
+
+def measure(block, context, value, executions):
+    context.set_data(value, 'value')
+    started = time.time()
+    for _ in range(executions):
+        block.execute(context, None)
+    return (time.time() - started) / executions * 1e6
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--executions', type='int', default=2000,
+                      help='executions of every block')
+    options, _ = parser.parse_args()
+
+    executor = base.create_executor()
+    context = Context(executor._root_context)
+    print('%-8s %14s %14s %14s' % ('keys', 'Match hit', 'Match default',
+                                   'Switch hit'))
+    for size in SIZES:
+        match = create_match(size)
+        hit = measure(match, context, 'k%d' % (size - 1), options.executions)
+        miss = measure(match, context, 'none', options.executions)
+        # Switch is linear in the number of branches, fewer runs suffice
+        switch = measure(create_switch(size), context, 'k%d' % (size - 1),
+                         max(1, options.executions * 10 / size))
+        print('%-8d %12.1fus %12.1fus %12.1fus' % (size, hit, miss, switch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Measures DSL method calls run inline and on spawned green threads.
+
+Calls a trivial method 100k times, once through invoke_method and once
+from a yaql expression evaluated in the frame of another method, with
+the method bodies run on the calling green thread (inline_calls) and on
+a green thread spawned per call. Run from the root of the repository:
+
+    python tools/bench_method_calls.py [-n CALLS]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl.yaql_expression import YaqlExpression as Y
+from engine.tests import base
+
+
+def invoke(executor, leaf):
+    return lambda: executor.invoke_method('who', leaf, None, None)
+
+
+def evaluate(executor, leaf):
+    frame = executor._create_context(leaf, leaf.type, None)
+    expression = Y('$.who()')
+    return lambda: expression.evaluate(frame)
+
+
+def measure(call, calls):
+    started = time.time()
+    for _ in xrange(calls):
+        call()
+    return time.time() - started
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--calls', type='int', default=100000,
+                      help='calls per case')
+    options, _ = parser.parse_args()
+
+    print('%-16s %10s %10s' % ('case', 'inline', 'spawned'))
+    for name, create_call in (('invoke_method', invoke),
+                              ('from yaql', evaluate)):
+        timings = []
+        for inline_calls in (True, False):
+            executor = base.create_executor(inline_calls=inline_calls)
+            call = create_call(executor, base.load_leaf(executor))
+            timings.append(measure(call, options.calls))
+        print('%-16s %9.3fs %9.3fs' % tuple([name] + timings))
+
+
+if __name__ == '__main__':
+    main()
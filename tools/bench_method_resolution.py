@@ -0,0 +1,76 @@
+"""Measures method resolution over a deep class hierarchy.
+
+Builds a chain of 10 classes, each extending the previous one and
+declaring one method, and looks up from the most derived class a method
+declared by itself, one declared by the root of the chain and one that
+does not exist. The cached method table of MuranoClass is compared with
+a walk of the parent tree on every lookup. Run from the root of the
+repository:
+
+    python tools/bench_method_resolution.py [-n LOOKUPS]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine import dsl
+
+DEPTH = 10
+
+
+class ChainClassLoader(dsl.MuranoClassLoader):
+    # c0 <- c1 <- ... <- c<DEPTH>, class cN declares method mN
+    def load_definition(self, name):
+        if name == 'com.mirantis.murano.Object':
+            return {'Name': name}
+        index = int(name[1:])
+        definition = {'Name': name,
+                      'Workflow': {'m%d' % index: {'Body': []}}}
+        if index > 0:
+            definition['Extends'] = [':c%d' % (index - 1)]
+        return definition
+
+
+def walk_find_method(murano_class, name):
+    if name in murano_class.methods:
+        return [(murano_class, name)]
+    result = []
+    for parent in murano_class.parents:
+        for implementation in walk_find_method(parent, name):
+            if implementation not in result:
+                result.append(implementation)
+    return result
+
+
+def measure(find_method, name, lookups):
+    started = time.time()
+    for _ in xrange(lookups):
+        find_method(name)
+    return (time.time() - started) / lookups * 1e6
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--lookups', type='int', default=100000,
+                      help='lookups of every method')
+    options, _ = parser.parse_args()
+
+    murano_class = ChainClassLoader().get_class('c%d' % DEPTH)
+    print('%-16s %10s %10s' % ('method', 'table', 'walk'))
+    for name in ('m%d' % DEPTH, 'm0', 'missing'):
+        assert murano_class.find_method(name) == \
+            walk_find_method(murano_class, name)
+        table = measure(murano_class.find_method, name, options.lookups)
+        walk = measure(lambda t: walk_find_method(murano_class, t), name,
+                       options.lookups)
+        print('%-16s %8.2fus %8.2fus' % (name, table, walk))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Measures validation of large list contracts by TypeScheme.
+
+Validates a list of 10k scalars and a list of 1k nested objects, once
+with the natively validated leaves and once with every leaf evaluated by
+yaql. Run from the root of the repository:
+
+    python tools/bench_type_scheme.py [-r REPEAT]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl import type_scheme
+from engine.dsl.yaql_expression import YaqlExpression as Y
+from engine.tests import base
+
+
+class InterpretedTypeScheme(type_scheme.TypeScheme):
+    def _get_native_leaves(self, namespace_resolver):
+        return {}
+
+
+def cases():
+    scalars = range(10000)
+    objects = [{'a': i, 'b': 'x%d' % i, 'c': ['p', 'q'], 'd': {'k': i}}
+               for i in range(1000)]
+    object_contract = {
+        'a': Y('$.int()'), 'b': Y('$.string().notNull()'),
+        'c': [Y('$.string()')], 'd': {Y('$.string()'): Y('$.int()')}}
+    return [
+        ('10k scalars', [Y('$.int().notNull()')], scalars),
+        ('10k scalars, check()', [Y('$.int().check($ >= 0)')], scalars),
+        ('1k objects', [object_contract], objects)
+    ]
+
+
+def measure(scheme, data, deployment, repeat):
+    executor, leaf = deployment
+    best = None
+    for _ in range(repeat):
+        started = time.time()
+        scheme(data, executor._root_context, leaf, executor.object_store,
+               leaf.type.namespace_resolver, None)
+        elapsed = time.time() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                      help='runs per case, the best one is reported')
+    options, _ = parser.parse_args()
+
+    executor = base.create_executor()
+    deployment = executor, base.load_leaf(executor)
+    print('%-22s %10s %10s' % ('case', 'native', 'yaql'))
+    for name, contract, data in cases():
+        native = measure(type_scheme.TypeScheme(contract), data,
+                         deployment, options.repeat)
+        interpreted = measure(InterpretedTypeScheme(contract), data,
+                              deployment, options.repeat)
+        print('%-22s %9.3fs %9.3fs' % (name, native, interpreted))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Measures compiled and interpreted evaluation of yaql expressions.
+
+Evaluates a set of workflow expressions in the frame of a DSL method,
+once with an executor that compiles expressions into Python closures and
+once with one that leaves them to the yaql interpreter, checking that
+both give the same results. Run from the root of the repository:
+
+    python tools/bench_yaql_compiler.py [-n EVALUATIONS]
+"""
+
+from __future__ import print_function
+
+import optparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl.yaql_expression import YaqlExpression as Y
+from engine.tests import base
+
+EXPRESSIONS = (
+    '$.counter',
+    '$n + 1',
+    '$n < 100 and $n > 0',
+    '$d.a.b',
+    '$lst[1]',
+    '$.who()',
+    '$.items[0].value',
+    '$.items.where($.value > 0).select($.value).sum()'
+)
+
+
+def create_frame(compile_expressions):
+    executor = base.create_executor(compile_expressions)
+    leaf = base.load_leaf(executor)
+    return executor._create_context(leaf, leaf.type, None, n=3,
+                                    lst=[1, 2, 3], d={'a': {'b': 1}})
+
+
+def measure(expression, frame, evaluations):
+    result = base.normalize(expression.evaluate(frame))
+    started = time.time()
+    for _ in xrange(evaluations):
+        expression.evaluate(frame)
+    return (time.time() - started) / evaluations * 1e6, result
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--evaluations', type='int', default=20000,
+                      help='evaluations of every expression')
+    options, _ = parser.parse_args()
+
+    compiled_frame = create_frame(True)
+    interpreted_frame = create_frame(False)
+    print('%-48s %10s %12s' % ('expression', 'compiled', 'interpreted'))
+    for text in EXPRESSIONS:
+        expression = Y(text)
+        compiled, expected = measure(expression, compiled_frame,
+                                     options.evaluations)
+        interpreted, result = measure(expression, interpreted_frame,
+                                      options.evaluations)
+        assert result == expected, text
+        print('%-48s %8.1fus %10.1fus' % (text, compiled, interpreted))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Measures the classification of manifest scalars as yaql expressions.
+
+YaqlExpression.match is the implicit YAML resolver of !yaql, so it runs
+on every plain scalar of every manifest. Classifies the distinct plain
+scalars found in meta/ with a yaql.parse of every string, with the
+lexical prefilter in front of the parser and with the verdict cache,
+checking that all three agree. Run from the root of the repository:
+
+    python tools/bench_yaql_match.py [-p PASSES]
+"""
+
+from __future__ import print_function
+
+import glob
+import optparse
+import os
+import re
+import sys
+import time
+
+import yaml
+import yaql
+import yaql.exceptions
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from engine.dsl import yaql_expression
+
+META_PATH = os.path.join(os.path.dirname(__file__), '..', 'meta')
+
+
+def plain_scalars(node, found):
+    if isinstance(node, yaml.ScalarNode):
+        if node.style is None:
+            found.add(node.value)
+    elif isinstance(node, yaml.SequenceNode):
+        for item in node.value:
+            plain_scalars(item, found)
+    elif isinstance(node, yaml.MappingNode):
+        for key, value in node.value:
+            plain_scalars(key, found)
+            plain_scalars(value, found)
+    return found
+
+
+def load_scalars():
+    found = set()
+    for path in glob.glob(os.path.join(META_PATH, '*', 'manifest.yaml')):
+        with open(path) as stream:
+            plain_scalars(yaml.compose(stream), found)
+    return sorted(found)
+
+
+def parse_match(expr):
+    # the classification before the prefilter: a full parse per string
+    if re.match('^[\s\w\d.:]*$', expr):
+        return False
+    try:
+        yaql.parse(expr)
+        return True
+    except yaql.exceptions.YaqlGrammarException:
+        return False
+    except yaql.exceptions.YaqlLexicalException:
+        return False
+
+
+def clear_caches():
+    yaql_expression.parse_cache.clear()
+    yaql_expression._match_verdicts.clear()
+
+
+def prefilter_match(expr):
+    clear_caches()
+    return yaql_expression._match(expr)
+
+
+def measure(match, scalars, passes):
+    clear_caches()
+    started = time.time()
+    for _ in range(passes):
+        verdicts = [match(t) for t in scalars]
+    return time.time() - started, verdicts
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-p', '--passes', type='int', default=20,
+                      help='passes over the scalars')
+    options, _ = parser.parse_args()
+
+    scalars = load_scalars()
+    print('%d distinct plain scalars, %d passes' % (len(scalars),
+                                                     options.passes))
+    print('%-16s %10s %10s' % ('classifier', 'time', 'yaql'))
+    expected = None
+    for name, match in (('parse', parse_match),
+                        ('prefilter', prefilter_match),
+                        ('verdict cache',
+                         yaql_expression.YaqlExpression.match)):
+        elapsed, verdicts = measure(match, scalars, options.passes)
+        if expected is None:
+            expected = verdicts
+        assert verdicts == expected, name
+        print('%-16s %9.3fs %10d' % (name, elapsed, sum(verdicts)))
+
+
+if __name__ == '__main__':
+    main()